@@ -0,0 +1,96 @@
+# backend/admission.py
+# Admission control for the LLM-backed interaction endpoints.
+# Bounds how many interactions are processed concurrently, how many may wait
+# for a slot, and how long a single request may take, so that a slow Groq call
+# turns into a fast 429/503 instead of an unbounded pile-up in the worker.
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted (queue full or time budget exceeded)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def headers(self) -> dict:
+        return {"Retry-After": str(self.retry_after)}
+
+
+class AdmissionController:
+    """Semaphore-based concurrency limit with a bounded wait queue and a per-request time budget."""
+
+    def __init__(self, max_concurrency: int, max_queue: int, timeout_seconds: float, queue_wait_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.queue_wait_seconds = queue_wait_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        # Exponentially weighted average of service time, used to estimate Retry-After
+        self._avg_service_seconds = 1.0
+
+    def retry_after(self) -> int:
+        backlog = self.waiting + self.in_flight
+        estimate = self._avg_service_seconds * max(backlog, 1) / self.max_concurrency
+        return max(1, math.ceil(estimate))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Acquire a processing slot, rejecting immediately if too many requests are already waiting."""
+        if not self._semaphore.locked():
+            # A slot is free: acquire() returns without suspending
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                raise AdmissionRejected(429, "Too many interactions are queued for processing.", self.retry_after())
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_wait_seconds)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected(503, "Timed out waiting for a processing slot.", self.retry_after())
+            finally:
+                self.waiting -= 1
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * elapsed
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def run(self, awaitable: Awaitable[Any], timeout_seconds: Optional[float] = None) -> Any:
+        """Run `awaitable` inside a slot, enforcing the per-request time budget."""
+        budget = timeout_seconds if timeout_seconds is not None else self.timeout_seconds
+        try:
+            async with self.slot():
+                try:
+                    return await asyncio.wait_for(awaitable, timeout=budget)
+                except asyncio.TimeoutError:
+                    raise AdmissionRejected(503, f"Interaction processing exceeded the {budget:g}s time budget.", self.retry_after())
+        finally:
+            # A rejected request never awaited its coroutine; close it to avoid "never awaited" warnings
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+
+
+def admission_from_env() -> AdmissionController:
+    """Build the controller from environment variables."""
+    return AdmissionController(
+        max_concurrency=int(os.getenv("EXTRACTION_MAX_CONCURRENCY", "32")),
+        max_queue=int(os.getenv("EXTRACTION_MAX_QUEUE", "64")),
+        timeout_seconds=float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "30")),
+        queue_wait_seconds=float(os.getenv("EXTRACTION_QUEUE_WAIT_SECONDS", "5")),
+    )
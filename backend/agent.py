@@ -0,0 +1,249 @@
+# backend/agent.py
+# The LangGraph interaction agent: graph state, tool nodes and routing.
+# Imports LangGraph, so backend.main loads this module on first use (or at startup when WARM_LLM_STACK=1).
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from typing_extensions import TypedDict, Annotated
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import StateGraph, START, END
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession # For type hinting the db session
+
+from .catalog import catalog_store
+from .database import Interaction, HcpHistory
+from .extraction import extract_and_enrich
+from .history import format_history_summary
+from .projections import record_inserted, record_updated
+from .sessions import EDITABLE_FIELDS, InteractionNotFound, explicit_patch, normalize_edit, parse_edit
+from .telemetry import GRAPH_NODE_DURATION, GRAPH_NODE_ERRORS, log_event
+
+# LangGraph State Schema
+def merge_dicts(current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """State reducer: merge node updates into extracted_data instead of overwriting it.
+    A None value removes the field, so extracted_data only ever holds fields that are set."""
+    merged = {**(current or {}), **(update or {})}
+    return {name: value for name, value in merged.items() if value is not None}
+
+class GraphState(TypedDict):
+    input: str
+    context: Dict[str, Any]
+    extracted_data: Annotated[Dict[str, Any], merge_dicts]
+    suggested_followups: List[str]
+    history_summary: str
+    suggested_resources: List[str]
+    interaction_id: Optional[int] # The logged (or edited) interaction's row ID
+    updated_fields: List[str] # Fields changed by edit_interaction
+
+# --- LangGraph Tool Functions (Modified to accept config for DB session) ---
+# Each tool now expects `config` to access the database session.
+
+async def log_interaction_tool(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    """Extract interaction details from natural language input using the configured LLM and save to DB."""
+    db: AsyncSession = config["configurable"]["db_session"] # Get session from config
+    interaction_writer = config["configurable"].get("interaction_writer") # Set in write-behind mode
+    input_text = state["input"]
+
+    try:
+        extracted_data = await extract_and_enrich(input_text)
+        
+        if interaction_writer is not None:
+            # Write-behind mode: the ID is assigned immediately and the row is group-committed in the background.
+            # Callers that need durability pass context={"durable": True} to wait for the commit.
+            interaction_id, accepted = await interaction_writer.submit(Interaction.column_values(extracted_data))
+            if state.get("context", {}).get("durable", False):
+                await accepted
+            log_event("Interaction queued for write-behind", interaction_id=interaction_id)
+            return {"extracted_data": extracted_data, "interaction_id": interaction_id}
+
+        # --- NEW: Save extracted data to SQLite ---
+        new_interaction = Interaction(**Interaction.column_values(extracted_data))
+        db.add(new_interaction)
+        await db.flush() # INSERT first: assigns the ID and takes the write lock before derived tables are updated
+        await db.run_sync(record_inserted, [new_interaction]) # Keep the per-HCP history rollup in step
+        await db.commit() # Commit the transaction; the ID is populated by the INSERT, no refresh needed
+        log_event("Interaction logged to DB", interaction_id=new_interaction.id)
+
+        return {"extracted_data": extracted_data, "interaction_id": new_interaction.id}
+
+    except Exception as e:
+        await db.rollback() # Rollback on error
+        log_event("Error during LLM extraction or DB save in log_interaction_tool", level="error", error=str(e))
+        raise # Re-raise to propagate the error
+
+async def edit_interaction_tool(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    """Apply an edit to the stored draft (the session's, or the row named by context["interaction_id"]) and
+    update its database row in place. Changes come from the fast-path rules and context["patch"]; no LLM call."""
+    db: AsyncSession = config["configurable"]["db_session"] # Get session from config
+    interaction_writer = config["configurable"].get("interaction_writer") # Set in write-behind mode
+    context = state.get("context", {})
+    interaction_id = state.get("interaction_id")
+
+    try:
+        if interaction_id is None:
+            raise InteractionNotFound("There is no logged interaction to edit")
+        if interaction_writer is not None:
+            await interaction_writer.wait_committed(interaction_id) # The row may still be queued for its group commit
+        # Take the write lock before reading the row: two concurrent edits must not both compute their changes (and
+        # rollup deltas) from the version the other one is replacing. The no-op UPDATE leaves updated_at alone.
+        await db.execute(text("UPDATE interactions SET id = id WHERE id = :id"), {"id": interaction_id})
+        row = await db.get(Interaction, interaction_id, populate_existing=True)
+        if row is None:
+            raise InteractionNotFound(f"Interaction {interaction_id} no longer exists")
+        # The row is the source of truth: another session may have edited it since this draft was stored.
+        # Its unset fields are None, which also clears them from a stale draft in the graph state (see merge_dicts).
+        draft = row.to_dict()
+
+        catalog = await catalog_store.current()
+        changes = normalize_edit({**parse_edit(state["input"], draft, catalog), **explicit_patch(context.get("patch"))}, draft, catalog)
+        updated_fields = [name for name, value in changes.items() if draft.get(name) != value]
+        updated = {**draft, **{name: changes[name] for name in updated_fields}}
+
+        if updated_fields:
+            previous = {column: getattr(row, column) for column in Interaction.column_values({})}
+            # Only the edited columns are written, so concurrent edits of other fields are kept
+            for name in updated_fields:
+                setattr(row, EDITABLE_FIELDS[name], updated[name])
+            await db.flush()
+            await db.run_sync(record_updated, [row], {row.id: previous})
+            await db.commit()
+            log_event("Interaction updated in DB", interaction_id=interaction_id, fields=",".join(updated_fields))
+        else:
+            await db.rollback() # Release the write lock
+            log_event("Edit changed no fields", interaction_id=interaction_id)
+    except Exception as e:
+        await db.rollback()
+        log_event("Error applying edit in edit_interaction_tool", level="error", interaction_id=interaction_id, error=str(e))
+        raise
+
+    return {"extracted_data": updated, "updated_fields": updated_fields}
+
+async def suggest_followup_tool(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    """Generate follow-up suggestions based on the interaction context."""
+    extracted_data = state.get("extracted_data", {})
+    catalog = await catalog_store.current()
+
+    followups = []
+    hcp_name = extracted_data.get("hcpName", "")
+    sentiment = extracted_data.get("hcpSentiment", "")
+
+    hcp = catalog.resolve_hcp(hcp_name)
+    if hcp is not None:
+        followups.append(f"Schedule next meeting according to {hcp.name}'s preference: {hcp.preferences}")
+        
+        # Products named in the extraction or mentioned in the topics, matched in one pass over the text
+        mentioned = [catalog.canonical_product(p) or p for p in extracted_data.get("productsDiscussed") or []]
+        mentioned += catalog.find_products(extracted_data.get("topicsDiscussed"))
+        for product_name in dict.fromkeys(mentioned):
+            product = catalog.products.get(product_name)
+            if product and product.followup_hint and product.therapeutic_area == hcp.specialty:
+                followups.append(product.followup_hint)
+                break
+    
+    if sentiment == "Positive":
+        followups.append("Send thank you email with additional resources discussed")
+        followups.append("Invite to upcoming product symposium")
+    elif sentiment == "Negative":
+        followups.append("Schedule call to address concerns")
+        followups.append("Share additional safety data to address hesitations")
+    else:
+        followups.append("Share additional clinical data that may help with decision making")
+        followups.append("Schedule follow-up call in 2 weeks to continue the discussion")
+    
+    while len(followups) < 2:
+        followups.append("Schedule routine follow-up in 4-6 weeks")
+    
+    return {"suggested_followups": followups[:3]}
+
+async def summarize_history_tool(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    """Summarize previous interactions with this HCP (from the per-HCP history rollup)."""
+    db: AsyncSession = config["configurable"]["db_session"] # Get session from config
+    hcp_name = state.get("extracted_data", {}).get("hcpName")
+    
+    if hcp_name:
+        # Single primary-key lookup; the rollup is maintained on every interaction write
+        history_row = await db.get(HcpHistory, hcp_name)
+        return {"history_summary": format_history_summary(history_row)}
+    else:
+        return {"history_summary": "No HCP name provided to summarize history."}
+
+async def suggest_resources_tool(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    """Suggest relevant resources based on the interaction products and topics (from the materials catalog)."""
+    extracted_data = state.get("extracted_data", {})
+    catalog = await catalog_store.current()
+    products_discussed = extracted_data.get("productsDiscussed") or []
+    
+    suggested_resources = []
+    
+    for product in products_discussed:
+        suggested_resources.extend(catalog.materials_for(catalog.canonical_product(product) or product))
+
+    if not suggested_resources:
+        # Fall back to products mentioned anywhere in the topics
+        for product in catalog.find_products(extracted_data.get("topicsDiscussed")):
+            suggested_resources.extend(catalog.materials_for(product))
+    
+    if not suggested_resources:
+        suggested_resources = [
+            "Company overview brochure",
+            "Product catalog",
+            "Recent publications list"
+        ]
+    
+    return {"suggested_resources": list(dict.fromkeys(suggested_resources))[:3]}
+
+# --- Create the LangGraph Agent ---
+# The tool functions are now designed to accept a `config` dictionary.
+# This config will carry the database session.
+# Enrichment nodes only read `extracted_data` and write disjoint state keys, so they run concurrently.
+ENRICHMENT_NODES = ["suggest_followup", "summarize_history", "suggest_resources"]
+
+def route_enrichments(state: GraphState) -> List[str]:
+    """Pick the enrichment nodes this request needs; they are fanned out in parallel.
+    `context["enrichments"]` may restrict the set, and history is skipped when no HCP was extracted."""
+    requested = state.get("context", {}).get("enrichments")
+    nodes = [node for node in ENRICHMENT_NODES if requested is None or node in requested]
+    if not state.get("extracted_data", {}).get("hcpName"):
+        nodes = [node for node in nodes if node != "summarize_history"]
+    return nodes or [END]
+
+def route_entry(state: GraphState) -> str:
+    """Edits (context["is_edit"]) patch the stored draft and never run extraction or insert a row."""
+    if state.get("context", {}).get("is_edit", False):
+        return "edit_interaction"
+    return "log_interaction"
+
+def timed_node(name: str, tool: Callable[[GraphState, RunnableConfig], Awaitable[Dict[str, Any]]]):
+    """Wrap a tool so its wall time and failures are recorded per node."""
+    async def node(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return await tool(state, config)
+        except Exception:
+            GRAPH_NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            GRAPH_NODE_DURATION.observe(time.perf_counter() - started, node=name)
+    return node
+
+def create_interaction_agent():
+    workflow = StateGraph(GraphState) 
+    
+    # Tools are wrapped for per-node timing; they will expect `state` and `config`
+    workflow.add_node("log_interaction", timed_node("log_interaction", log_interaction_tool))
+    workflow.add_node("edit_interaction", timed_node("edit_interaction", edit_interaction_tool))
+    workflow.add_node("suggest_followup", timed_node("suggest_followup", suggest_followup_tool))
+    workflow.add_node("summarize_history", timed_node("summarize_history", summarize_history_tool))
+    workflow.add_node("suggest_resources", timed_node("suggest_resources", suggest_resources_tool))
+    
+    # log | edit -> {suggest_followup, summarize_history, suggest_resources} in parallel -> END
+    workflow.add_conditional_edges(START, route_entry, ["log_interaction", "edit_interaction"])
+    workflow.add_conditional_edges("log_interaction", route_enrichments, [*ENRICHMENT_NODES, END])
+    workflow.add_conditional_edges("edit_interaction", route_enrichments, [*ENRICHMENT_NODES, END])
+    for node in ENRICHMENT_NODES:
+        workflow.add_edge(node, END)
+    
+    return workflow.compile()
+
+# Compiled once, when this module is first imported
+interaction_agent = create_interaction_agent()
@@ -0,0 +1,344 @@
+# backend/benchmark.py
+# Reproducible load test for the interaction pipeline, run in-process against the ASGI app (no network, no
+# real LLM: LLM_PROVIDER=fake with simulated latency). Each run uses its own SQLite file, pre-seeded with
+# synthetic interactions, and reports p50/p95/p99 latency, requests/sec and DB write rate per scenario.
+#
+# CLI usage (requires httpx):
+#   python -m backend.benchmark --rows 10000 100000 --save-baseline bench_baseline.json
+#   python -m backend.benchmark --rows 10000 100000 --compare bench_baseline.json   # exits 1 on regression
+#
+# Scenarios:
+#   single      sequential POST /api/interactions/process (per-request latency)
+#   throughput  concurrent POST /api/interactions/process (--concurrency clients)
+#   batch       POST /api/interactions/batch with --batch-size notes per request
+#   history     per-HCP history reads (the summarize_history lookup) on the seeded database
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+SCENARIOS = ["single", "throughput", "batch", "history"]
+
+_FIRST_NAMES = ["Anita", "James", "Maria", "Wei", "Olga", "Samuel", "Priya", "Lucas", "Fatima", "Kenji", "Grace", "Omar"]
+_LAST_NAMES = ["Patel", "Smith", "Johnson", "Garcia", "Chen", "Kowalski", "Okafor", "Nguyen", "Rossi", "Haddad", "Tanaka", "Murphy", "Silva", "Novak"]
+# Letters only, so generated names are picked up by the fast path's "Dr. First Last" rule
+_SURNAME_SUFFIXES = ["", "son", "berg", "ley", "ton", "field", "wood", "man", "ford", "stein"]
+_PRODUCTS = ["OncoBoost", "CardioPlus", "NeuroCalm"]
+_TOPICS = ["the efficacy data", "dosing in elderly patients", "the safety profile", "formulary access", "the new trial results", "patient adherence"]
+_MATERIALS = ["efficacy brochure", "dosing guide", "trial summary", "safety sheet"]
+_SENTIMENT_WORDS = {"Positive": ["very interested", "enthusiastic", "impressed"], "Negative": ["skeptical", "concerned", "hesitant"], "Neutral": ["noncommittal", "undecided"]}
+_TYPE_VERBS = {"Meeting": "Met", "Call": "Called", "Email": "Emailed", "Virtual Meeting": "Had a video call with"}
+
+
+def hcp_pool(size: int, seed: int = 7) -> List[str]:
+    """Deterministic HCP names; the catalog's demo HCPs come first so some notes resolve against the catalog."""
+    if size > len(_FIRST_NAMES) * len(_LAST_NAMES) * len(_SURNAME_SUFFIXES) // 2:
+        raise ValueError(f"At most {len(_FIRST_NAMES) * len(_LAST_NAMES) * len(_SURNAME_SUFFIXES) // 2} synthetic HCPs are supported")
+    rng = random.Random(seed)
+    names = ["Dr. Patel", "Dr. Smith", "Dr. Johnson"]
+    seen = set(names)
+    while len(names) < size:
+        name = f"Dr. {rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}{rng.choice(_SURNAME_SUFFIXES)}"
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names[:size]
+
+
+def generate_note(rng: random.Random, hcps: List[str], today: date) -> str:
+    """One synthetic interaction note. About half are fully rule-resolvable (the fast path skips the LLM),
+    a third are partially resolvable (trimmed prompt) and the rest need the full LLM prompt."""
+    hcp = rng.choice(hcps)
+    product = rng.choice(_PRODUCTS)
+    sentiment = rng.choice(list(_SENTIMENT_WORDS))
+    when = today - timedelta(days=rng.randint(1, 300))
+    kind = rng.random()
+    if kind < 0.5:
+        verb = _TYPE_VERBS[rng.choice(list(_TYPE_VERBS))]
+        return (
+            f"{verb} {hcp} on {when.strftime('%B')} {when.day} at {rng.randint(8, 17)}:{rng.choice(['00', '30'])}. "
+            f"We discussed {product} and {rng.choice(_TOPICS)}. The doctor was {rng.choice(_SENTIMENT_WORDS[sentiment])}. "
+            f"Will send the {rng.choice(_MATERIALS)} next week."
+        )
+    if kind < 0.85:
+        return f"Quick catch-up with {hcp} about {product.lower()}; {rng.choice(_TOPICS)} came up a lot."
+    return f"Spent the afternoon with the {rng.choice(['oncology', 'cardiology', 'neurology'])} team going over {rng.choice(_TOPICS)}."
+
+
+def generate_notes(count: int, seed: int = 1, hcp_count: int = 500) -> List[str]:
+    rng = random.Random(seed)
+    hcps = hcp_pool(hcp_count)
+    today = date.today()
+    return [generate_note(rng, hcps, today) for _ in range(count)]
+
+
+def seed_interactions(target_rows: int, hcp_count: int = 500, seed: int = 3, chunk_size: int = 10_000) -> int:
+    """Top the configured database up to `target_rows` synthetic interactions (bulk core INSERTs, no LLM),
+    then rebuild the derived tables once. Returns the number of rows inserted."""
+    from sqlalchemy import func, insert, select
+    from .database import Interaction, SessionLocal
+    from .projections import rebuild_all
+
+    with SessionLocal() as db:
+        existing = db.scalar(select(func.count(Interaction.id))) or 0
+    missing = target_rows - existing
+    if missing <= 0:
+        return 0
+
+    rng = random.Random(seed + existing)
+    hcps = hcp_pool(hcp_count)
+    start = datetime.utcnow() - timedelta(days=730)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        for offset in range(0, missing, chunk_size):
+            rows = []
+            for _ in range(min(chunk_size, missing - offset)):
+                created = start + timedelta(seconds=rng.randint(0, 730 * 86400))
+                product = rng.choice(_PRODUCTS)
+                sentiment = rng.choice(list(_SENTIMENT_WORDS))
+                rows.append({
+                    **Interaction.column_values({
+                        "hcpName": rng.choice(hcps),
+                        "interactionType": rng.choice(list(_TYPE_VERBS)),
+                        "date": created.date().isoformat(),
+                        "time": created.strftime("%H:%M"),
+                        "productsDiscussed": [product],
+                        "topicsDiscussed": f"Discussed {product} and {rng.choice(_TOPICS)}",
+                        "hcpSentiment": sentiment,
+                        "followUpActions": f"Send the {rng.choice(_MATERIALS)}",
+                    }),
+                    "created_at": created,
+                    "updated_at": created,
+                })
+            db.execute(insert(Interaction), rows)
+            db.commit()
+            print(f"[benchmark] Seeded {offset + len(rows)}/{missing} rows")
+        # Derived tables are rebuilt in one pass rather than maintained row by row during seeding
+        rebuild_all(db)
+        db.commit()
+    print(f"[benchmark] Seeding took {time.perf_counter() - started:.1f}s")
+    return missing
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: float, requests: int, errors: int, rows_written: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "requests_per_second": round(requests / elapsed, 2) if elapsed else 0.0,
+        "rows_written_per_second": round(rows_written / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def _interaction_count() -> int:
+    from sqlalchemy import func, select
+    from .database import Interaction, SessionLocal
+
+    with SessionLocal() as db:
+        return db.scalar(select(func.count(Interaction.id))) or 0
+
+
+async def _timed_post(client, url: str, payload: Any, latencies: List[float]) -> bool:
+    started = time.perf_counter()
+    response = await client.post(url, json=payload)
+    latencies.append(time.perf_counter() - started)
+    return response.status_code == 200
+
+
+async def run_scenario(name: str, client, args: argparse.Namespace, notes: List[str]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    rows_before = _interaction_count()
+    started = time.perf_counter()
+
+    if name == "single":
+        for text in notes[:args.requests]:
+            errors += not await _timed_post(client, "/api/interactions/process", {"text": text}, latencies)
+        requests = args.requests
+    elif name == "throughput":
+        queue = iter(notes[:args.requests])
+
+        async def worker():
+            nonlocal errors
+            for text in queue:
+                errors += not await _timed_post(client, "/api/interactions/process", {"text": text}, latencies)
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        requests = args.requests
+    elif name == "batch":
+        requests = 0
+        for offset in range(0, args.requests, args.batch_size):
+            errors += not await _timed_post(client, "/api/interactions/batch", notes[offset:offset + args.batch_size], latencies)
+            requests += 1
+    elif name == "history":
+        from .database import AsyncSessionLocal, HcpHistory
+        from .history import format_history_summary
+
+        rng = random.Random(11)
+        hcps = hcp_pool(args.hcps)
+        async with AsyncSessionLocal() as db:
+            for _ in range(args.requests):
+                lookup_started = time.perf_counter()
+                format_history_summary(await db.get(HcpHistory, rng.choice(hcps)))
+                latencies.append(time.perf_counter() - lookup_started)
+                db.expunge_all() # Measure the database read, not the identity map
+        requests = args.requests
+    else:
+        raise ValueError(f"Unknown scenario {name!r}")
+
+    elapsed = time.perf_counter() - started
+    # Give write-behind mode a chance to flush before counting rows
+    await asyncio.sleep(0.2 if os.getenv("INTERACTION_WRITE_MODE") == "write_behind" else 0)
+    return summarize(latencies, elapsed, requests, errors, _interaction_count() - rows_before)
+
+
+async def run_all(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from . import main
+
+    notes = generate_notes(max(args.requests, 1) * len(args.scenarios), seed=args.seed, hcp_count=args.hcps)
+    results = {}
+    async with main.lifespan(main.app):
+        # Import the LLM stack before timing so the first request doesn't pay for it
+        main.llm_stack()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for index, name in enumerate(args.scenarios):
+                scenario_notes = notes[index * args.requests:(index + 1) * args.requests]
+                results[name] = await run_scenario(name, client, args, scenario_notes)
+                print(f"[benchmark] {name}@{args.rows[0]}: {json.dumps(results[name])}")
+    return results
+
+
+def run_size(args: argparse.Namespace) -> Dict[str, Any]:
+    """Benchmark one database size in this process (the database URL is fixed at import time)."""
+    rows = args.rows[0]
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(args.data_dir, f'bench_{rows}.db')}"
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("LLM_FAKE_LATENCY_MS", str(args.llm_latency_ms))
+    os.environ.setdefault("LLM_FAKE_JITTER_MS", str(args.llm_jitter_ms))
+    # Every note is new, and cached extractions would hide the pipeline cost
+    os.environ.setdefault("EXTRACTION_CACHE_ENABLED", "0")
+
+    from .database import create_db_and_tables
+    create_db_and_tables()
+    seed_interactions(rows, hcp_count=args.hcps)
+    results = asyncio.run(run_all(args))
+    return {f"{name}@{rows}": result for name, result in results.items()}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions: p95 latency above, or throughput below, the baseline by more than `tolerance`."""
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        current = results.get(key)
+        if current is None:
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {current['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if base["requests_per_second"] and current["requests_per_second"] < base["requests_per_second"] * (1 - tolerance):
+            regressions.append(f"{key}: {current['requests_per_second']} req/s vs baseline {base['requests_per_second']} req/s")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{key}: {current['errors']} errors vs baseline {base['errors']}")
+    return regressions
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"{'scenario':<22}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'rows/s':>10}")
+    for key, r in results.items():
+        print(
+            f"{key:<22}{r['requests']:>9}{r['errors']:>8}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+            f"{r['p99_ms']:>10}{r['requests_per_second']:>10}{r['rows_written_per_second']:>10}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the interaction pipeline with a fake LLM.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000], help="Pre-seeded interaction rows (one run per size), e.g. 10000 100000 1000000")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario (notes for the batch scenario)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients in the throughput scenario")
+    parser.add_argument("--batch-size", type=int, default=50, help="Notes per request in the batch scenario")
+    parser.add_argument("--hcps", type=int, default=500, help="Distinct HCPs in seeded data and generated notes")
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="Simulated LLM latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=50, help="Simulated LLM latency jitter (+/-)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the note generator")
+    parser.add_argument("--data-dir", default="bench_data", help="Directory for the seeded SQLite files (reused across runs)")
+    parser.add_argument("--output", help="Write this run's results to a JSON file")
+    parser.add_argument("--save-baseline", help="Save this run's results as the baseline JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file; exit 1 if any scenario regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression vs the baseline")
+    args = parser.parse_args(argv)
+
+    if len(args.rows) == 1:
+        results = run_size(args)
+    else:
+        # One subprocess per database size: the engines bind DATABASE_URL at import
+        results = {}
+        for rows in args.rows:
+            output = os.path.join(args.data_dir, f"results_{rows}.json")
+            child_argv = argv if argv is not None else sys.argv[1:]
+            for option in ("--save-baseline", "--compare"):
+                child_argv = _strip_option(child_argv, option)
+            child_argv = _replace_option(_replace_option(child_argv, "--rows", [str(rows)]), "--output", [output])
+            os.makedirs(args.data_dir, exist_ok=True)
+            subprocess.run([sys.executable, "-m", "backend.benchmark", *child_argv], check=True)
+            with open(output) as f:
+                results.update(json.load(f)["results"])
+
+    report = {"created_at": datetime.utcnow().isoformat(), "config": {k: v for k, v in vars(args).items() if k not in ("output", "save_baseline", "compare")}, "results": results}
+    print_report(results)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    if args.save_baseline:
+        print(f"[benchmark] Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("[benchmark] Regressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print("[benchmark] No regressions against the baseline.")
+
+
+def _strip_option(argv: List[str], option: str) -> List[str]:
+    """Remove `option` and its values (everything up to the next flag) from an argv list."""
+    stripped, skipping = [], False
+    for arg in argv:
+        if arg.startswith("--"):
+            skipping = arg == option or arg.startswith(option + "=")
+        if not skipping:
+            stripped.append(arg)
+    return stripped
+
+
+def _replace_option(argv: List[str], option: str, values: List[str]) -> List[str]:
+    return [*_strip_option(argv, option), option, *values]
+
+
+if __name__ == "__main__":
+    main()
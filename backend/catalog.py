@@ -0,0 +1,368 @@
+# backend/catalog.py
+# In-memory index over the HCP and product catalog tables (hcps, products, materials).
+# - HCP names are normalized ("Dr. Patel", "Patel, Anita", "anita patel MD") and resolved exactly, by surname,
+#   or fuzzily, so history and follow-ups line up however the rep wrote the name.
+# - Product mentions in free text are found in a single pass with an Aho-Corasick automaton over all
+#   product names and aliases, instead of one substring check per product.
+# The index is rebuilt whenever catalog_meta.version changes (bumped by triggers on every catalog write).
+#
+# CLI usage:
+#   python -m backend.catalog load catalog.json   # upsert {"hcps": [...], "products": [...]} into the catalog
+import argparse
+import asyncio
+import difflib
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from .database import CatalogMeta, Hcp, Material, Product, SessionLocal
+from .telemetry import log_event
+
+# Seed data for an empty catalog (the original demo HCPs and materials)
+DEFAULT_HCPS = [
+    {"name": "Dr. Patel", "specialty": "Oncology", "preferences": "Prefers morning meetings", "territory": "Northeast"},
+    {"name": "Dr. Smith", "specialty": "Cardiology", "preferences": "Likes clinical data", "territory": "Midwest"},
+    {"name": "Dr. Johnson", "specialty": "Neurology", "preferences": "Interested in new trials", "territory": "West"},
+]
+
+DEFAULT_PRODUCTS = [
+    {
+        "name": "OncoBoost",
+        "aliases": ["onco boost"],
+        "therapeutic_area": "Oncology",
+        "followup_hint": "Share the latest patient outcomes data for OncoBoost in similar cancer types",
+        "materials": ["Phase III trial results", "Patient selection guide", "Dosing information"],
+    },
+    {
+        "name": "CardioPlus",
+        "aliases": ["cardio plus"],
+        "therapeutic_area": "Cardiology",
+        "followup_hint": "Provide comparative efficacy data for CardioPlus vs. standard of care",
+        "materials": ["Efficacy data", "Comparison chart", "Safety profile"],
+    },
+    {
+        "name": "NeuroCalm",
+        "aliases": ["neuro calm"],
+        "therapeutic_area": "Neurology",
+        "followup_hint": "Follow up with new clinical trial enrollment information",
+        "materials": ["Clinical outcomes", "Patient case studies", "Administration guide"],
+    },
+]
+
+# How often (seconds) a worker checks catalog_meta.version for changes
+CATALOG_RELOAD_SECONDS = float(os.getenv("CATALOG_RELOAD_SECONDS", "5"))
+# Minimum difflib ratio for a fuzzy HCP-name match
+HCP_FUZZY_CUTOFF = float(os.getenv("HCP_FUZZY_CUTOFF", "0.85"))
+
+_HONORIFICS = {"dr", "doctor", "prof", "professor", "mr", "mrs", "ms", "md", "phd", "rn", "np", "jr", "sr"}
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def normalize_person_name(name: str) -> Tuple[str, ...]:
+    """Tokens of a person's name in "first ... last" order, without titles or degrees.
+    "Dr. Patel" -> ("patel",); "Patel, Anita" -> ("anita", "patel"); "Anita Patel, MD" -> ("anita", "patel")."""
+    name = normalize_text(name)
+    if "," in name:
+        # "Last, First" (but not "First Last, MD"): move the part before the comma to the end
+        head, tail = name.split(",", 1)
+        tail_tokens = [t for t in _NON_WORD_RE.sub(" ", tail).split() if t not in _HONORIFICS]
+        name = f"{tail} {head}" if tail_tokens else head
+    tokens = [t for t in _NON_WORD_RE.sub(" ", name).split() if t not in _HONORIFICS]
+    return tuple(tokens)
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of any pattern in one pass over the text.
+    Matches must fall on word boundaries, so "cardio plus" does not match inside "cardio plush"."""
+
+    def __init__(self, patterns: Dict[str, str]):
+        # patterns maps the (normalized) text to look for -> the value to report
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str]]] = [[]]
+        for pattern, value in patterns.items():
+            self._add(pattern, value)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, value: str) -> None:
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), value))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> List[str]:
+        """Values of all patterns found in `text` (already normalized), in order of first occurrence."""
+        found: Dict[str, None] = {}
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, value in self._output[state]:
+                start = end - length + 1
+                before_ok = start == 0 or not text[start - 1].isalnum()
+                after_ok = end + 1 == len(text) or not text[end + 1].isalnum()
+                if before_ok and after_ok:
+                    found.setdefault(value, None)
+        return list(found)
+
+
+@dataclass
+class HcpRecord:
+    name: str
+    specialty: Optional[str]
+    preferences: Optional[str]
+    tokens: Tuple[str, ...] = ()
+
+
+@dataclass
+class ProductRecord:
+    name: str
+    therapeutic_area: Optional[str]
+    followup_hint: Optional[str]
+    materials: List[str] = field(default_factory=list)
+
+
+class CatalogIndex:
+    """Immutable snapshot of the catalog, indexed for sub-millisecond lookups."""
+
+    def __init__(self, hcps: Iterable[HcpRecord], products: Iterable[ProductRecord], aliases: Dict[str, List[str]], version: int = 0):
+        self.version = version
+        self.hcps_by_key: Dict[Tuple[str, ...], HcpRecord] = {}
+        self.hcps_by_surname: Dict[str, List[HcpRecord]] = {}
+        for hcp in hcps:
+            hcp.tokens = normalize_person_name(hcp.name)
+            if not hcp.tokens:
+                continue
+            self.hcps_by_key[hcp.tokens] = hcp
+            self.hcps_by_surname.setdefault(hcp.tokens[-1], []).append(hcp)
+        # Fuzzy matching only compares names whose surname starts with the same letter, to keep it cheap at scale
+        self._fuzzy_keys: Dict[str, Dict[str, HcpRecord]] = {}
+        for key, hcp in self.hcps_by_key.items():
+            self._fuzzy_keys.setdefault(key[-1][0], {})[" ".join(key)] = hcp
+
+        self.products: Dict[str, ProductRecord] = {p.name: p for p in products}
+        patterns = {}
+        for product in self.products.values():
+            patterns[normalize_text(product.name)] = product.name
+            for alias in aliases.get(product.name, []):
+                patterns[normalize_text(alias)] = product.name
+        self._product_names = dict(patterns) # normalized name/alias -> canonical name
+        self._matcher = AhoCorasick(patterns)
+
+    def resolve_hcp(self, name: Optional[str]) -> Optional[HcpRecord]:
+        """Find the catalog HCP for a name as written by a rep or the LLM, or None."""
+        if not name:
+            return None
+        tokens = normalize_person_name(name)
+        if not tokens:
+            return None
+        exact = self.hcps_by_key.get(tokens)
+        if exact is not None:
+            return exact
+
+        given_names, surname = tokens[:-1], tokens[-1]
+        same_surname = self.hcps_by_surname.get(surname, [])
+        if same_surname and not given_names:
+            # "Dr. Patel" is only unambiguous when the catalog has a single Patel
+            return same_surname[0] if len(same_surname) == 1 else None
+        if same_surname:
+            # With a given name, only an entry whose given name agrees (equal, or an initial) matches: a surname-only
+            # entry ("Dr. Patel") or another Patel may be a different doctor
+            candidates = [hcp for hcp in same_surname if hcp.tokens[:-1] and _given_names_compatible(given_names, hcp.tokens[:-1])]
+            return candidates[0] if len(candidates) == 1 else None
+
+        bucket = self._fuzzy_keys.get(surname[0], {})
+        close = difflib.get_close_matches(" ".join(tokens), list(bucket), n=1, cutoff=HCP_FUZZY_CUTOFF)
+        if not close:
+            return None
+        hcp = bucket[close[0]]
+        if given_names and not (hcp.tokens[:-1] and _given_names_compatible(given_names, hcp.tokens[:-1])):
+            # Same rule for a misspelled surname: a given name never pairs with a surname-only or different entry
+            return None
+        return hcp
+
+    def canonical_product(self, name: str) -> Optional[str]:
+        return self._product_names.get(normalize_text(name))
+
+    def find_products(self, text: Optional[str]) -> List[str]:
+        """Canonical names of all catalog products mentioned in `text`."""
+        if not text:
+            return []
+        return self._matcher.find(normalize_text(text))
+
+    def materials_for(self, product_name: str) -> List[str]:
+        product = self.products.get(product_name)
+        return list(product.materials) if product else []
+
+    def default_materials(self, products: Iterable[str]) -> List[Dict[str, str]]:
+        """materialsShared for notes that name products but no materials: each product's first catalog material."""
+        defaults = []
+        for product in products:
+            materials = self.materials_for(product)
+            if materials:
+                defaults.append({"id": product, "name": materials[0]})
+        return defaults
+
+
+def _given_names_compatible(query: Tuple[str, ...], candidate: Tuple[str, ...]) -> bool:
+    """Equal first given names, one an initial of the other, or a close misspelling ("Emilly"/"Emily", not "Raj"/"Rajiv")."""
+    q, c = query[0], candidate[0]
+    if q == c or (len(q) == 1 and c.startswith(q)) or (len(c) == 1 and q.startswith(c)):
+        return True
+    return len(q) > 1 and len(c) > 1 and difflib.SequenceMatcher(None, q, c).ratio() >= HCP_FUZZY_CUTOFF
+
+
+def catalog_version(session: Session) -> int:
+    return session.scalar(select(CatalogMeta.version).where(CatalogMeta.id == 1)) or 0
+
+
+def load_catalog_index(session: Session) -> CatalogIndex:
+    version = catalog_version(session)
+    hcps = [
+        HcpRecord(name=h.name, specialty=h.specialty, preferences=h.preferences)
+        for h in session.scalars(select(Hcp))
+    ]
+    products, aliases = [], {}
+    for p in session.scalars(select(Product).options(selectinload(Product.materials))):
+        products.append(ProductRecord(
+            name=p.name,
+            therapeutic_area=p.therapeutic_area,
+            followup_hint=p.followup_hint,
+            materials=[m.title for m in p.materials],
+        ))
+        aliases[p.name] = list(p.aliases or [])
+    return CatalogIndex(hcps, products, aliases, version=version)
+
+
+def upsert_catalog(session: Session, hcps: List[Dict[str, Any]], products: List[Dict[str, Any]]) -> None:
+    """Insert or update HCPs and products (with their materials) by name."""
+    existing_hcps = {h.name: h for h in session.scalars(select(Hcp))}
+    territory_changed = False
+    for item in hcps:
+        hcp = existing_hcps.get(item["name"]) or Hcp(name=item["name"])
+        territory_changed = territory_changed or hcp.territory != item.get("territory")
+        hcp.specialty = item.get("specialty")
+        hcp.preferences = item.get("preferences")
+        hcp.territory = item.get("territory")
+        session.add(hcp)
+    if territory_changed:
+        # Product mention rollups copy each HCP's territory into their key
+        from .rollups import rebuild_product_mentions
+        session.flush()
+        rebuild_product_mentions(session)
+
+    existing_products = {p.name: p for p in session.scalars(select(Product).options(selectinload(Product.materials)))}
+    for item in products:
+        product = existing_products.get(item["name"]) or Product(name=item["name"])
+        product.aliases = list(item.get("aliases", []))
+        product.therapeutic_area = item.get("therapeutic_area")
+        product.followup_hint = item.get("followup_hint")
+        if "materials" in item:
+            product.materials = [Material(title=title, sort_order=i) for i, title in enumerate(item["materials"])]
+        session.add(product)
+
+
+def seed_catalog_if_empty(session: Session) -> bool:
+    if session.scalar(select(Hcp.id).limit(1)) is not None or session.scalar(select(Product.id).limit(1)) is not None:
+        return False
+    upsert_catalog(session, DEFAULT_HCPS, DEFAULT_PRODUCTS)
+    return True
+
+
+class CatalogStore:
+    """Holds the current CatalogIndex and swaps in a fresh one when the catalog version changes.
+    The version check runs at most every CATALOG_RELOAD_SECONDS and off the event loop."""
+
+    def __init__(self, reload_seconds: float = CATALOG_RELOAD_SECONDS):
+        self.reload_seconds = reload_seconds
+        self._index: Optional[CatalogIndex] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def load(self) -> CatalogIndex:
+        with SessionLocal() as db:
+            self._index = load_catalog_index(db)
+        self._checked_at = time.monotonic()
+        return self._index
+
+    def _reload_if_changed(self) -> CatalogIndex:
+        with SessionLocal() as db:
+            if self._index is None or catalog_version(db) != self._index.version:
+                self._index = load_catalog_index(db)
+                log_event("Catalog index loaded", version=self._index.version, hcps=len(self._index.hcps_by_key), products=len(self._index.products))
+        self._checked_at = time.monotonic()
+        return self._index
+
+    @property
+    def index(self) -> CatalogIndex:
+        """The last loaded index (empty before the first load), without a version check."""
+        return self._index or CatalogIndex([], [], {})
+
+    async def current(self) -> CatalogIndex:
+        if self._index is not None and time.monotonic() - self._checked_at < self.reload_seconds:
+            return self._index
+        async with self._lock:
+            if self._index is not None and time.monotonic() - self._checked_at < self.reload_seconds:
+                return self._index
+            return await asyncio.to_thread(self._reload_if_changed)
+
+
+catalog_store = CatalogStore()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the HCP and product catalog.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    load_parser = subparsers.add_parser("load", help="Upsert HCPs and products from a JSON file")
+    load_parser.add_argument("path", help='JSON file: {"hcps": [{"name", "specialty", "preferences", "territory"}], "products": [{"name", "aliases", "therapeutic_area", "followup_hint", "materials"}]}')
+    args = parser.parse_args(argv)
+
+    from .database import create_db_and_tables
+    create_db_and_tables(seed_catalog=False)
+
+    with open(args.path) as f:
+        payload = json.load(f)
+    with SessionLocal() as db:
+        upsert_catalog(db, payload.get("hcps", []), payload.get("products", []))
+        db.commit()
+        print(f"[catalog] Loaded {len(payload.get('hcps', []))} HCPs and {len(payload.get('products', []))} products (version {catalog_version(db)})")
+
+
+if __name__ == "__main__":
+    main()
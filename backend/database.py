@@ -1,27 +1,87 @@
 # backend/database.py
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, JSON
+import os
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event, inspect, text, DDL, Column, Date, ForeignKey, Index, Integer, String, DateTime, Text, JSON
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from sqlalchemy.orm import sessionmaker, relationship, validates
+from datetime import date, datetime
+from typing import Dict, Any, Optional
+
+from .telemetry import log_event
 
 # Define your SQLite database URL.
 # This will create a file named 'pharma_interactions.db' in the same directory as your main.py
-SQLALCHEMY_DATABASE_URL = "sqlite:///./pharma_interactions.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pharma_interactions.db")
+# Same database through the aiosqlite driver, used by the async request path
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# Connection pool sizing and lock wait, shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Per-connection SQLite tuning:
+# - WAL lets readers proceed while a writer commits, and synchronous=NORMAL is durable under WAL
+#   except for the last transactions on power loss (one fsync per checkpoint instead of per commit)
+# - cache_size is negative KiB (64 MiB page cache); mmap_size maps up to 256 MiB of the file
+# - busy_timeout makes writers wait for the lock instead of failing immediately with "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+    "busy_timeout": DB_BUSY_TIMEOUT_MS,
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
 
 # Create the SQLAlchemy engine
 # connect_args={"check_same_thread": False} is necessary for SQLite when used with FastAPI
 # because FastAPI can run multiple threads concurrently, and SQLite is not thread-safe by default.
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_MS / 1000},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
 )
+event.listen(engine, "connect", _apply_sqlite_pragmas)
+
+# Async engine for the request path, so DB I/O does not block the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"timeout": DB_BUSY_TIMEOUT_MS / 1000},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
 
 # Create a SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async sessions keep attributes loaded after commit, so tools can read IDs without another round trip
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Declare a base class for your declarative models.
 Base = declarative_base()
 
+def parse_interaction_day(value: Optional[str]) -> Optional[date]:
+    """YYYY-MM-DD (optionally followed by a time) to a date; anything else is None."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
 # Define your SQLAlchemy model for interactions
 class Interaction(Base):
     __tablename__ = "interactions" # Name of the table in your database
@@ -30,6 +90,7 @@ class Interaction(Base):
     hcp_name = Column(String, index=True, nullable=True)
     interaction_type = Column(String, nullable=True)
     interaction_date = Column(String, nullable=True) # Storing as string to match your Pydantic schema
+    interaction_day = Column(Date, nullable=True) # interaction_date as a typed, sortable date (None if unparseable)
     interaction_time = Column(String, nullable=True) # Storing as string to match your Pydantic schema
     products_discussed = Column(JSON, nullable=True) # Store as JSON
     topics_discussed = Column(Text, nullable=True)
@@ -39,6 +100,24 @@ class Interaction(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Serves per-HCP history scans in creation order (history rebuilds and consistency checks)
+        Index("ix_interactions_hcp_name_created_at", "hcp_name", "created_at"),
+        # Keyset pagination for GET /api/interactions: newest day first, ID as tie-breaker, optionally per filter
+        Index("ix_interactions_day_id", "interaction_day", "id"),
+        Index("ix_interactions_hcp_name_day_id", "hcp_name", "interaction_day", "id"),
+        Index("ix_interactions_sentiment_day_id", "hcp_sentiment", "interaction_day", "id"),
+        Index("ix_interactions_type_day_id", "interaction_type", "interaction_day", "id"),
+        # Incremental exports: rows changed since a watermark, in (updated_at, id) order
+        Index("ix_interactions_updated_at_id", "updated_at", "id"),
+    )
+
+    @validates("interaction_date")
+    def _sync_interaction_day(self, key, value):
+        # Keep the typed column in step whenever the string date is set (inserts and edits)
+        self.interaction_day = parse_interaction_day(value)
+        return value
+
     def __repr__(self):
         return f"<Interaction(id={self.id}, hcp_name='{self.hcp_name}')>"
 
@@ -57,6 +136,173 @@ class Interaction(Base):
             # 'id', 'created_at', 'updated_at' are typically internal
         }
 
+    # Inverse of to_dict: map extracted (camelCase) fields to column values, usable for ORM objects and bulk inserts
+    @staticmethod
+    def column_values(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "hcp_name": extracted_data.get("hcpName"),
+            "interaction_type": extracted_data.get("interactionType"),
+            "interaction_date": extracted_data.get("date"),
+            "interaction_day": parse_interaction_day(extracted_data.get("date")), # Set here too for bulk (core) inserts
+            "interaction_time": extracted_data.get("time"),
+            "products_discussed": extracted_data.get("productsDiscussed"), # SQLite can store JSON
+            "topics_discussed": extracted_data.get("topicsDiscussed"),
+            "materials_shared": extracted_data.get("materialsShared"), # SQLite can store JSON
+            "hcp_sentiment": extracted_data.get("hcpSentiment"),
+            "follow_up_actions": extracted_data.get("followUpActions"),
+        }
+
+# Normalized interaction <-> product index, maintained on every interaction write (see product_index.py).
+# interaction_day is copied from the interaction so "product X between two dates, newest first" is answered
+# from ix_interaction_products_product_day alone, without parsing products_discussed JSON.
+class InteractionProduct(Base):
+    __tablename__ = "interaction_products"
+
+    interaction_id = Column(Integer, ForeignKey("interactions.id", ondelete="CASCADE"), primary_key=True)
+    product = Column(String, primary_key=True)
+    interaction_day = Column(Date, nullable=True)
+
+    __table_args__ = (
+        Index("ix_interaction_products_product_day", "product", "interaction_day", "interaction_id"),
+    )
+
+    def __repr__(self):
+        return f"<InteractionProduct(interaction_id={self.interaction_id}, product='{self.product}')>"
+
+# Per-HCP rollup of interaction history, maintained on every interaction write (see history.py)
+# so that history reads are a single primary-key lookup instead of a sort over the HCP's interactions.
+class HcpHistory(Base):
+    __tablename__ = "hcp_history"
+
+    hcp_name = Column(String, primary_key=True)
+    interaction_count = Column(Integer, nullable=False, default=0)
+    recent_interactions = Column(JSON, nullable=False, default=list) # Newest first, bounded to HISTORY_RECENT_LIMIT
+    sentiment_counts = Column(JSON, nullable=False, default=dict) # e.g. {"Positive": 3, "Neutral": 1}
+    products = Column(JSON, nullable=False, default=list) # Sorted, de-duplicated products ever discussed
+    last_contact_date = Column(String, nullable=True) # Latest interaction_date seen
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<HcpHistory(hcp_name='{self.hcp_name}', interaction_count={self.interaction_count})>"
+
+# Weekly analytics rollups, maintained on every interaction write (see rollups.py).
+# week_start is the Monday of the interaction's week; missing values are stored as "" so they can be part of the key.
+class SentimentRollup(Base):
+    __tablename__ = "sentiment_rollups"
+
+    week_start = Column(Date, primary_key=True)
+    hcp_name = Column(String, primary_key=True)
+    sentiment = Column(String, primary_key=True)
+    interaction_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_sentiment_rollups_hcp_week", "hcp_name", "week_start"),
+    )
+
+# Product mentions drop the HCP dimension, which keeps the table a few rows per week; territory is copied from
+# hcps at write time (catalog.upsert_catalog recomputes the table when an HCP changes territory).
+# An interaction discussing two products counts once for each.
+class ProductMentionRollup(Base):
+    __tablename__ = "product_mention_rollups"
+
+    week_start = Column(Date, primary_key=True)
+    territory = Column(String, primary_key=True)
+    product = Column(String, primary_key=True)
+    sentiment = Column(String, primary_key=True)
+    mention_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_product_mention_rollups_product_week", "product", "week_start"),
+    )
+
+# --- HCP and product catalog (see catalog.py) ---
+# Any write to these tables bumps catalog_meta.version through triggers, which is how running workers
+# notice catalog changes and hot-reload their in-memory index.
+class CatalogMeta(Base):
+    __tablename__ = "catalog_meta"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class Hcp(Base):
+    __tablename__ = "hcps"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True) # Display name, e.g. "Dr. Anita Patel"
+    specialty = Column(String, nullable=True)
+    preferences = Column(Text, nullable=True)
+    territory = Column(String, nullable=True) # Sales territory, used to group analytics trends
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Hcp(id={self.id}, name='{self.name}')>"
+
+class Product(Base):
+    __tablename__ = "products"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True) # Canonical product name, e.g. "OncoBoost"
+    aliases = Column(JSON, nullable=False, default=list) # Other spellings matched in free text, e.g. ["onco boost"]
+    therapeutic_area = Column(String, nullable=True) # Compared with Hcp.specialty for follow-up suggestions
+    followup_hint = Column(Text, nullable=True) # Specialty-specific follow-up suggestion
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    materials = relationship("Material", order_by="Material.sort_order", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<Product(id={self.id}, name='{self.name}')>"
+
+class Material(Base):
+    __tablename__ = "materials"
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
+    title = Column(String, nullable=False)
+    sort_order = Column(Integer, nullable=False, default=0) # The first material is the default one shared
+
+    def __repr__(self):
+        return f"<Material(id={self.id}, title='{self.title}')>"
+
+event.listen(CatalogMeta.__table__, "after_create", DDL("INSERT INTO catalog_meta (id, version) VALUES (1, 0)"))
+for _catalog_table in ("hcps", "products", "materials"):
+    for _operation in ("INSERT", "UPDATE", "DELETE"):
+        event.listen(Base.metadata.tables[_catalog_table], "after_create", DDL(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{_catalog_table}_{_operation.lower()}_version "
+            f"AFTER {_operation} ON {_catalog_table} "
+            f"BEGIN UPDATE catalog_meta SET version = version + 1 WHERE id = 1; END"
+        ))
+
+# --- Full-text search over interaction notes (see search.py) ---
+# External-content FTS5 table: it stores only the index, the text stays in `interactions`.
+# Triggers keep it in step with every write path, including bulk core INSERTs.
+FTS_TABLE = "interactions_fts"
+FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "topics_discussed, follow_up_actions, content='interactions', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS trg_interactions_fts_insert AFTER INSERT ON interactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, topics_discussed, follow_up_actions) VALUES (new.id, new.topics_discussed, new.follow_up_actions); END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_interactions_fts_delete AFTER DELETE ON interactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, topics_discussed, follow_up_actions) VALUES ('delete', old.id, old.topics_discussed, old.follow_up_actions); END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_interactions_fts_update AFTER UPDATE OF topics_discussed, follow_up_actions ON interactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, topics_discussed, follow_up_actions) VALUES ('delete', old.id, old.topics_discussed, old.follow_up_actions); "
+    f"INSERT INTO {FTS_TABLE}(rowid, topics_discussed, follow_up_actions) VALUES (new.id, new.topics_discussed, new.follow_up_actions); END",
+]
+
+def _create_search_index() -> bool:
+    """Create the FTS table and triggers if missing, indexing existing rows when the table is new.
+    Returns False when this SQLite build lacks FTS5 (search is then disabled)."""
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}).first() is not None
+        try:
+            for statement in FTS_DDL:
+                conn.execute(text(statement))
+        except OperationalError as e:
+            log_event("Full-text search disabled", level="warning", error=str(e))
+            return False
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
 # Dependency for FastAPI to get a database session
 def get_db():
     db = SessionLocal()
@@ -65,6 +311,81 @@ def get_db():
     finally:
         db.close()
 
-# Function to create tables (for initial setup)
-def create_db_and_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+# Async variant of get_db for endpoints on the async request path
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# One AsyncSession per LangGraph run, passed to the tools through config["configurable"]["db_session"].
+# Rolled back if the run fails; an AsyncSession must not be used by two nodes at the same time.
+@asynccontextmanager
+async def graph_session():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+
+# Columns added to existing tables after their first release, with the statement that fills them in
+COLUMN_BACKFILLS = {
+    ("interactions", "interaction_day"): "UPDATE interactions SET interaction_day = date(interaction_date) WHERE interaction_date IS NOT NULL",
+}
+
+def _add_missing_columns():
+    """create_all never alters existing tables: add model columns missing from the database (nullable, no default)
+    and run their backfill statements."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"))
+                if (table.name, column.name) in COLUMN_BACKFILLS:
+                    conn.execute(text(COLUMN_BACKFILLS[(table.name, column.name)]))
+                log_event("Added column", table=table.name, column=column.name)
+
+def _backfill_new_tables(existing_tables: set) -> None:
+    """Build derived tables that create_all just added to a database that already holds interactions.
+    Runs from whichever entry point (server, ingest, CLIs) touches the database first; a table that only becomes
+    empty later is left alone (the `rebuild` CLIs handle that)."""
+    if "interactions" not in existing_tables:
+        return
+    # Imported here: these modules import this one
+    from .history import rebuild_history
+    from .product_index import rebuild_product_index
+    from .rollups import rebuild_rollups
+    with SessionLocal() as db:
+        if HcpHistory.__tablename__ not in existing_tables:
+            log_event("Built per-HCP history rollups from existing interactions.", hcps=rebuild_history(db))
+        if InteractionProduct.__tablename__ not in existing_tables:
+            log_event("Built the interaction/product index from existing interactions.", rows=rebuild_product_index(db))
+        if not {SentimentRollup.__tablename__, ProductMentionRollup.__tablename__} <= existing_tables:
+            # After the product index, which it reads
+            log_event("Built weekly analytics rollups from existing interactions.", **rebuild_rollups(db))
+        db.commit()
+
+def _seed_catalog() -> None:
+    from .catalog import seed_catalog_if_empty # Imported here: catalog imports this module
+    with SessionLocal() as db:
+        if seed_catalog_if_empty(db):
+            db.commit()
+            log_event("Seeded the HCP and product catalog with demo data.")
+
+# Function to create tables (for initial setup). Every entry point (server, ingest and the other CLIs) calls it,
+# so the catalog is seeded before the first extraction; `python -m backend.catalog load` passes seed_catalog=False
+# to start from its own catalog instead of the demo data.
+def create_db_and_tables(seed_catalog: bool = True):
+    existing_tables = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _create_search_index()
+    # create_all skips indexes on tables that already exist, so add any indexes introduced since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    if seed_catalog:
+        _seed_catalog()
+    _backfill_new_tables(existing_tables)
@@ -0,0 +1,178 @@
+# backend/export.py
+# Constant-memory export of the interactions table as NDJSON or CSV, optionally gzip-compressed on the fly.
+# Rows are read as plain tuples through a server-side cursor (yield_per), serialized into ~64 KiB chunks and
+# streamed, so memory stays flat no matter how large the table is.
+#
+# Incremental exports: rows with since < updated_at <= watermark, where the watermark is taken when the export
+# starts. Pass the returned watermark as `since` next time. updated_at is set in Python when a row is flushed,
+# before its transaction takes the write lock and commits, so a row can become visible after rows with newer
+# timestamps. The watermark therefore trails the clock by EXPORT_WATERMARK_LAG_SECONDS (well above the lock wait
+# plus a write transaction): rows newer than that are left for the next run, which still sees every late commit. updated_at is naive UTC; a `since` with a
+# UTC offset ("2024-05-01T00:00:00Z") is converted to it.
+#
+# CLI usage:
+#   python -m backend.export --format csv --gzip --output interactions.csv.gz
+#   python -m backend.export --watermark-file export.watermark --output nightly.ndjson   # incremental
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from .database import Interaction, SessionLocal
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_WATERMARK_LAG_SECONDS = float(os.getenv("EXPORT_WATERMARK_LAG_SECONDS", "30"))
+
+# (output field, column), in output order; JSON columns are emitted as JSON text in CSV cells
+EXPORT_FIELDS: List[Tuple[str, Any]] = [
+    ("id", Interaction.id),
+    ("hcpName", Interaction.hcp_name),
+    ("interactionType", Interaction.interaction_type),
+    ("date", Interaction.interaction_date),
+    ("time", Interaction.interaction_time),
+    ("productsDiscussed", Interaction.products_discussed),
+    ("topicsDiscussed", Interaction.topics_discussed),
+    ("materialsShared", Interaction.materials_shared),
+    ("hcpSentiment", Interaction.hcp_sentiment),
+    ("followUpActions", Interaction.follow_up_actions),
+    ("createdAt", Interaction.created_at),
+    ("updatedAt", Interaction.updated_at),
+]
+EXPORT_HEADER = [name for name, _ in EXPORT_FIELDS]
+
+
+def parse_since(value: str) -> datetime:
+    """Parse an ISO timestamp as naive UTC (the way updated_at is stored); naive input is taken to be UTC already."""
+    return to_naive_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def export_watermark(since: Optional[datetime] = None) -> Optional[datetime]:
+    """Upper bound for an export starting now: the newest updated_at, but no later than EXPORT_WATERMARK_LAG_SECONDS
+    ago, since transactions still in flight may commit older timestamps (None when nothing is newer than `since`)."""
+    settled = datetime.utcnow() - timedelta(seconds=EXPORT_WATERMARK_LAG_SECONDS)
+    with SessionLocal() as db:
+        newest = db.scalar(select(func.max(Interaction.updated_at)))
+    if newest is None:
+        return None
+    watermark = min(newest, settled)
+    if since is not None and watermark <= since:
+        return None
+    return watermark
+
+
+def _json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else value
+
+
+def iter_rows(since: Optional[datetime], watermark: Optional[datetime]) -> Iterator[tuple]:
+    """Stream (since, watermark] in (updated_at, id) order as tuples, EXPORT_YIELD_PER rows per fetch."""
+    if watermark is None:
+        return
+    query = select(*[column for _, column in EXPORT_FIELDS]).where(Interaction.updated_at <= watermark)
+    if since is not None:
+        query = query.where(Interaction.updated_at > since)
+    query = query.order_by(Interaction.updated_at, Interaction.id)
+    with SessionLocal() as db:
+        # One read transaction: the export sees a consistent snapshot under WAL while writers continue
+        for row in db.execute(query.execution_options(yield_per=EXPORT_YIELD_PER)):
+            yield row
+
+
+def serialize(rows: Iterator[tuple], fmt: str) -> Iterator[str]:
+    """Rows to NDJSON lines or CSV records (with a header), grouped into ~EXPORT_CHUNK_BYTES text chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        if writer is not None:
+            writer.writerow([_csv_value(value) for value in row])
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_HEADER, map(_json_value, row))), ensure_ascii=False))
+            buffer.write("\n")
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode(chunks: Iterator[str], gzip: bool) -> Iterator[bytes]:
+    """UTF-8 encode, and gzip-compress incrementally when asked (wbits=31 writes the gzip container)."""
+    if not gzip:
+        for chunk in chunks:
+            yield chunk.encode("utf-8")
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_interactions(fmt: str = "ndjson", gzip: bool = False, since: Optional[datetime] = None, watermark: Optional[datetime] = None) -> Iterator[bytes]:
+    """The full export as a byte stream. Compute `watermark` with export_watermark() before streaming."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    return encode(serialize(iter_rows(since, watermark), fmt), gzip)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream the interactions table to NDJSON or CSV.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--since", type=parse_since, help="Only rows updated after this ISO timestamp")
+    parser.add_argument("--watermark-file", help="Read `since` from this file when present and store the new watermark after a successful export")
+    parser.add_argument("--output", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    since = args.since
+    if since is None and args.watermark_file and os.path.exists(args.watermark_file):
+        with open(args.watermark_file) as f:
+            since = parse_since(f.read().strip())
+
+    watermark = export_watermark(since)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_interactions(args.format, args.gzip, since, watermark):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    if args.watermark_file and watermark is not None:
+        # Written only after the export completed, atomically, so a failed run is simply repeated
+        tmp_path = f"{args.watermark_file}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(watermark.isoformat())
+        os.replace(tmp_path, args.watermark_file)
+    print(f"[export] Exported rows updated in ({since.isoformat() if since else 'beginning'}, {watermark.isoformat() if watermark else 'nothing new'}]", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
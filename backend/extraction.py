@@ -0,0 +1,223 @@
+# backend/extraction.py
+# Interaction extraction: prompts, LLM chains, the extraction cache and catalog enrichment.
+# Imports the LangChain stack, so backend.main loads this module on first use (or at startup when
+# WARM_LLM_STACK=1) rather than at import time.
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from .catalog import CatalogIndex, catalog_store
+from .extraction_cache import extraction_cache_from_env
+from .fast_path import FAST_PATH_HEURISTIC_FIELDS, FAST_PATH_REQUIRED_FIELDS, FastPathStats, estimate_tokens, fast_extract
+from .llm import llm_provider_from_env
+from .telemetry import LLM_REQUEST_DURATION, LLM_REQUESTS, LLM_TOKENS, log_event
+
+# Chat model backend (LLM_PROVIDER=groq|fake); the model itself is built on the first extraction
+llm_provider = llm_provider_from_env()
+
+def record_llm_usage(message):
+    """Count prompt/completion tokens from the model's reply (passed through unchanged to the parser)."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    # Older langchain-groq releases only report usage in response_metadata
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    prompt_tokens = usage.get("input_tokens", token_usage.get("prompt_tokens", 0))
+    completion_tokens = usage.get("output_tokens", token_usage.get("completion_tokens", 0))
+    LLM_TOKENS.inc(prompt_tokens, provider=llm_provider.name, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, provider=llm_provider.name, kind="completion")
+    return message
+
+# Pydantic model for LLM Extraction
+class ExtractedInteractionData(BaseModel):
+    hcpName: Optional[str] = Field(None, description="Name of the Healthcare Professional (HCP)")
+    interactionType: Optional[str] = Field(None, description="Type of interaction (e.g., Meeting, Call, Email)")
+    date: Optional[str] = Field(None, description="Date of the interaction in YYYY-MM-DD format")
+    time: Optional[str] = Field(None, description="Time of the interaction in HH:MM format (24-hour format)")
+    productsDiscussed: Optional[List[str]] = Field(None, description="List of pharmaceutical products discussed")
+    topicsDiscussed: Optional[str] = Field(None, description="Summary of key topics discussed during the interaction")
+    materialsShared: Optional[List[Dict[str, str]]] = Field(None, description="List of materials explicitly mentioned as shared, each with 'id' and 'name' fields.")
+    hcpSentiment: Optional[str] = Field(None, description="HCP's overall sentiment towards the discussion (e.g., Positive, Negative, Neutral)")
+    followUpActions: Optional[str] = Field(None, description="Specific follow-up actions required after the interaction")
+
+# Per-field extraction guidelines, shared by the full prompt and the trimmed (missing-fields-only) prompt
+EXTRACTION_FIELD_GUIDELINES = {
+    "hcpName": "Full name of the Healthcare Professional.",
+    "interactionType": "Examples: 'Meeting', 'Call', 'Email', 'Virtual Meeting'.",
+    "date": "Extract the exact date in YYYY-MM-DD format. If only a day of the week is given (e.g., 'yesterday', 'Monday'), try to infer the date relative to today's date if possible, otherwise omit.",
+    "time": "Extract the exact time in HH:MM (24-hour) format. If 'AM'/'PM' is used, convert it.",
+    "productsDiscussed": "A list of specific pharmaceutical product names mentioned.",
+    "topicsDiscussed": "A concise summary of the key subjects or themes covered during the interaction.",
+    "materialsShared": """A list of materials explicitly mentioned as being shared. Each item should have an 'id' (which can be the material name or a placeholder if no ID is clear) and 'name' (the material's title). For example: [{ "id": "Clinical Data", "name": "ProductX Clinical Study Results" }]""",
+    "hcpSentiment": "Assess the overall sentiment of the HCP towards the discussion. Choose from 'Positive', 'Negative', or 'Neutral'.",
+    "followUpActions": "Clearly state any specific actions the sales rep needs to take as a direct result of this interaction.",
+}
+EXTRACTION_FIELDS = list(EXTRACTION_FIELD_GUIDELINES)
+
+def format_field_guidelines(fields: List[str]) -> str:
+    return "\n    ".join(f"- '{name}': {EXTRACTION_FIELD_GUIDELINES[name]}" for name in fields)
+
+def subset_schema_json(fields: List[str]) -> str:
+    """JSON schema of ExtractedInteractionData restricted to `fields`."""
+    schema = ExtractedInteractionData.schema()
+    schema["properties"] = {name: spec for name, spec in schema["properties"].items() if name in fields}
+    return json.dumps(schema)
+
+# LLM Chain for Log Interaction
+log_interaction_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert AI assistant for pharmaceutical sales representatives. Your task is to extract all relevant details from the provided natural language description of an HCP interaction.
+
+    Extract the following fields accurately and precisely. If a piece of information is not explicitly mentioned or clearly inferable, omit that field (do not include it in the JSON) or set its value to null.
+
+    Ensure the output is a valid JSON object matching the following Pydantic schema:
+    {json_schema}
+
+    Here are some specific guidelines:
+    {field_guidelines}
+
+    Example of expected JSON for a simple interaction:
+    {{
+        "hcpName": "Dr. Sarah Lee",
+        "interactionType": "Meeting",
+        "date": "2024-05-20",
+        "time": "14:00",
+        "productsDiscussed": ["ProductX"],
+        "topicsDiscussed": "Discussed new clinical data for ProductX and its side effect profile.",
+        "materialsShared": [{{ "id": "Clinical Data", "name": "ProductX Clinical Study Results" }}],
+        "hcpSentiment": "Positive",
+        "followUpActions": "Send follow-up email with detailed safety profile."
+    }}
+    """),
+    ("human", "Interaction description: {interaction_text}")
+])
+
+# Bump whenever log_interaction_prompt changes so cached extractions from the old prompt are not reused
+LOG_INTERACTION_PROMPT_VERSION = "1"
+
+full_extraction_prompt = log_interaction_prompt.partial(
+    json_schema=ExtractedInteractionData.schema_json(),
+    field_guidelines=format_field_guidelines(EXTRACTION_FIELDS),
+)
+
+_full_extraction_chain = None
+
+def full_extraction_chain():
+    """The full-prompt chain, built on first use so a missing API key only fails actual extractions."""
+    global _full_extraction_chain
+    if _full_extraction_chain is None:
+        _full_extraction_chain = (
+            full_extraction_prompt
+            | llm_provider.chat_model()
+            | RunnableLambda(record_llm_usage)
+            | JsonOutputParser(pydantic_object=ExtractedInteractionData)
+        )
+    return _full_extraction_chain
+
+# Trimmed prompt used when the fast path already resolved some fields: asks only for the rest
+trimmed_extraction_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert AI assistant for pharmaceutical sales representatives. Extract only the fields listed below from the provided natural language description of an HCP interaction; the other fields have already been extracted.
+
+    If a piece of information is not explicitly mentioned or clearly inferable, omit that field or set its value to null.
+
+    Ensure the output is a valid JSON object matching the following schema:
+    {json_schema}
+
+    Guidelines:
+    {field_guidelines}
+    """),
+    ("human", "Interaction description: {interaction_text}")
+])
+
+def trimmed_extraction_chain(fields: List[str]):
+    return (
+        trimmed_extraction_prompt.partial(json_schema=subset_schema_json(fields), field_guidelines=format_field_guidelines(fields))
+        | llm_provider.chat_model()
+        | RunnableLambda(record_llm_usage)
+        | JsonOutputParser()
+    )
+
+# Approximate size of the full extraction prompt, used to report tokens saved by the fast path
+FULL_PROMPT_TOKENS = estimate_tokens(full_extraction_prompt.format(interaction_text=""))
+fast_path_stats = FastPathStats()
+
+# Content-addressed cache in front of the extraction chain (None when EXTRACTION_CACHE_ENABLED=0)
+extraction_cache = extraction_cache_from_env(
+    model_name=f"{llm_provider.name}:{llm_provider.model_name}",
+    prompt_version=LOG_INTERACTION_PROMPT_VERSION,
+    schema_json=ExtractedInteractionData.schema_json(),
+)
+
+async def extract_interaction_data(input_text: str) -> Dict[str, Any]:
+    """Extract interaction fields: rule-based fast path first, then the LLM (served from the extraction
+    cache when possible) only for the fields the rules could not resolve."""
+    fast = fast_extract(input_text, await catalog_store.current())
+    input_tokens = estimate_tokens(input_text)
+
+    confident = fast.confident()
+    if not fast.missing(FAST_PATH_REQUIRED_FIELDS):
+        if not fast.missing(list(FAST_PATH_HEURISTIC_FIELDS)):
+            fast_path_stats.record("llm_skipped", len(fast.values), FULL_PROMPT_TOKENS + input_tokens + estimate_tokens(json.dumps(fast.values)))
+            return dict(fast.values)
+        # The structured fields are settled; the free-text ones are not, and a note without them can't be found
+        # by full-text search, so ask the LLM for just those
+        wanted = list(FAST_PATH_HEURISTIC_FIELDS)
+    else:
+        wanted = [name for name in EXTRACTION_FIELDS if name not in confident]
+    if confident:
+        chain = trimmed_extraction_chain(wanted)
+        variant = "trimmed:" + ",".join(wanted)
+        trimmed_tokens = estimate_tokens(chain.first.format(interaction_text=""))
+        fast_path_stats.record("llm_trimmed", len(confident), max(FULL_PROMPT_TOKENS - trimmed_tokens, 0))
+    else:
+        chain = full_extraction_chain()
+        variant = "full"
+        fast_path_stats.record("llm_full", 0, 0)
+
+    async def run_chain() -> Dict[str, Any]:
+        log_event("Calling LLM", provider=llm_provider.name, fields=len(wanted), input=input_text[:100])
+        started = time.perf_counter()
+        try:
+            # Use the async chain so a slow LLM call does not block the event loop
+            extracted_data_llm = await chain.ainvoke({"interaction_text": input_text})
+        except Exception:
+            LLM_REQUESTS.inc(provider=llm_provider.name, outcome="error")
+            raise
+        finally:
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, provider=llm_provider.name, model=llm_provider.model_name)
+        LLM_REQUESTS.inc(provider=llm_provider.name, outcome="success")
+        # JsonOutputParser returns a plain dict; validate it and drop fields the LLM did not set
+        extracted = ExtractedInteractionData.parse_obj(extracted_data_llm).dict(exclude_unset=True)
+        return {name: value for name, value in extracted.items() if name in wanted}
+
+    if extraction_cache is None:
+        extracted_data = await run_chain()
+    else:
+        extracted_data = await extraction_cache.get_or_compute(input_text, run_chain, variant=variant)
+    # Fields resolved by the rules take precedence over the LLM's answer; heuristic ones only fill its gaps
+    return {**fast.values, **extracted_data, **confident}
+
+def apply_default_materials(extracted_data: Dict[str, Any], catalog: CatalogIndex) -> Dict[str, Any]:
+    """Canonicalize HCP and product names against the catalog and fill `materialsShared`
+    from the materials catalog when the LLM found products but no materials."""
+    hcp = catalog.resolve_hcp(extracted_data.get("hcpName"))
+    if hcp is not None:
+        # Store the catalog spelling so "Patel, Anita" and "Dr. Anita Patel" share one history
+        extracted_data["hcpName"] = hcp.name
+    if extracted_data.get("productsDiscussed"):
+        extracted_data["productsDiscussed"] = [
+            catalog.canonical_product(product) or product for product in extracted_data["productsDiscussed"]
+        ]
+
+    if "productsDiscussed" in extracted_data and not extracted_data.get("materialsShared"):
+        materials_shared = catalog.default_materials(extracted_data["productsDiscussed"] or [])
+        if materials_shared:
+            extracted_data["materialsShared"] = materials_shared
+    return extracted_data
+
+async def extract_and_enrich(input_text: str) -> Dict[str, Any]:
+    """Extraction as stored in the DB: LLM (or cache) output plus catalog canonicalization and default materials."""
+    extracted_data = await extract_interaction_data(input_text)
+    return apply_default_materials(extracted_data, await catalog_store.current())
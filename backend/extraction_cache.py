@@ -0,0 +1,125 @@
+# backend/extraction_cache.py
+# Content-addressed cache in front of the LLM extraction chain.
+# Keys are a hash of the normalized interaction text plus the model name, prompt version and schema version,
+# so changing any of those naturally invalidates old entries.
+import asyncio
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .kvstore import LRUCache, SqliteTTLStore
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_interaction_text(text: str) -> str:
+    """Normalize text so retries and copy-pasted notes that differ only in whitespace/Unicode form share a key."""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class ExtractionCache:
+    """Two-tier (LRU + optional SQLite) cache with single-flight coalescing of identical in-flight requests."""
+
+    def __init__(
+        self,
+        model_name: str,
+        prompt_version: str,
+        schema_version: str,
+        max_entries: int = 1024,
+        sqlite_path: Optional[str] = None,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_persistent_rows: int = 100_000,
+    ):
+        self.model_name = model_name
+        self.prompt_version = prompt_version
+        self.schema_version = schema_version
+        self.memory = LRUCache(max_entries)
+        self.persistent = (
+            SqliteTTLStore(sqlite_path, "extraction_cache", ttl_seconds, max_persistent_rows) if sqlite_path else None
+        )
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "coalesced": 0}
+
+    def key_for(self, text: str, variant: str = "") -> str:
+        # `variant` distinguishes different prompts for the same text (e.g. the trimmed missing-fields prompt)
+        material = "\x1f".join(
+            [normalize_interaction_text(text), self.model_name, self.prompt_version, self.schema_version, variant]
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get_or_compute(self, text: str, compute: Callable[[], Awaitable[Dict[str, Any]]], variant: str = "") -> Dict[str, Any]:
+        """Return the cached extraction for `text`, or run `compute` once for all concurrent callers."""
+        key = self.key_for(text, variant)
+
+        cached = self.memory.get(key)
+        if cached is not None:
+            self.stats["memory_hits"] += 1
+            return dict(cached)
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return dict(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. its time budget ran out); compute on our own behalf
+                if not pending.cancelled():
+                    raise
+                return await self.get_or_compute(text, compute, variant)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = None
+            if self.persistent is not None:
+                result = await asyncio.to_thread(self.persistent.get, key)
+                if result is not None:
+                    self.stats["persistent_hits"] += 1
+            if result is None:
+                self.stats["misses"] += 1
+                result = await compute()
+                if self.persistent is not None:
+                    await asyncio.to_thread(self.persistent.set, key, result)
+            self.memory.set(key, result)
+            future.set_result(result)
+            return dict(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Failures are not cached; waiters see the same error and the next request retries
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else is waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        # Coalesced requests were served without their own LLM call, so they count as hits
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"] + self.stats["coalesced"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self.memory),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def extraction_cache_from_env(model_name: str, prompt_version: str, schema_json: str) -> Optional[ExtractionCache]:
+    """Build the cache from environment variables; EXTRACTION_CACHE_ENABLED=0 disables it."""
+    if os.getenv("EXTRACTION_CACHE_ENABLED", "1") == "0":
+        return None
+    schema_version = hashlib.sha256(schema_json.encode("utf-8")).hexdigest()[:12]
+    return ExtractionCache(
+        model_name=model_name,
+        prompt_version=prompt_version,
+        schema_version=schema_version,
+        max_entries=int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "1024")),
+        sqlite_path=os.getenv("EXTRACTION_CACHE_SQLITE_PATH") or None,
+        ttl_seconds=float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        max_persistent_rows=int(os.getenv("EXTRACTION_CACHE_MAX_ROWS", "100000")),
+    )
@@ -0,0 +1,247 @@
+# backend/fast_path.py
+# Deterministic, rule-based pre-extraction for interaction notes.
+# Many notes state the date, time, interaction type, products and sentiment in very regular phrasing;
+# those fields are resolved here without the LLM. The LLM is then asked only for the remaining fields
+# (with a trimmed prompt), or skipped entirely when every required field and both free-text fields are resolved.
+# Topics and follow-up actions are only heuristic sentence picks: when the LLM runs it is asked for them too and its
+# answer wins. When only they are missing, the LLM is asked for just those two fields.
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from .catalog import CatalogIndex
+
+# Fields that must be resolved for the LLM call to be skipped entirely
+FAST_PATH_REQUIRED_FIELDS = [
+    name.strip()
+    for name in os.getenv(
+        "FAST_PATH_REQUIRED_FIELDS",
+        "hcpName,interactionType,date,productsDiscussed,hcpSentiment",
+    ).split(",")
+    if name.strip()
+]
+# Free-text fields the rules only approximate; they never override the LLM's answer
+FAST_PATH_HEURISTIC_FIELDS = ("topicsDiscussed", "followUpActions")
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTH_RE = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_US_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b")
+_MONTH_DAY_RE = re.compile(r"\b" + _MONTH_RE + r"\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?\b", re.IGNORECASE)
+_DAY_MONTH_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH_RE + r"\b(?:,?\s+(\d{4}))?", re.IGNORECASE)
+_RELATIVE_DAY_RE = re.compile(r"\b(today|yesterday|this morning|this afternoon|this evening|tonight)\b", re.IGNORECASE)
+_DAYS_AGO_RE = re.compile(r"\b(\d{1,2}|one|two|three|four|five|six)\s+days?\s+ago\b", re.IGNORECASE)
+_WEEKDAY_RE = re.compile(r"\b(?:(last|this|on)\s+)?(" + "|".join(_WEEKDAYS) + r")\b", re.IGNORECASE)
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+
+_AMPM_TIME_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\b\.?", re.IGNORECASE)
+_24H_TIME_RE = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+_NOON_RE = re.compile(r"\b(noon|midday)\b", re.IGNORECASE)
+
+# Checked in order; the first category with a match wins only if no other category matches
+_INTERACTION_TYPES = [
+    ("Virtual Meeting", re.compile(r"\b(virtual meeting|video call|zoom|teams call|webex|video conference)\b", re.IGNORECASE)),
+    ("Email", re.compile(r"\b(e-?mail(?:ed)?)\b", re.IGNORECASE)),
+    ("Call", re.compile(r"\b(call(?:ed)?|phone(?:d)?|spoke (?:by|over the) phone)\b", re.IGNORECASE)),
+    ("Meeting", re.compile(r"\b(met|meeting|visited|visit|in-person|lunch|dinner)\b", re.IGNORECASE)),
+]
+
+_NEGATED_POSITIVE_RE = re.compile(r"\bnot\s+(?:very\s+|really\s+)?(interested|convinced|impressed|receptive|keen|happy|pleased)\b", re.IGNORECASE)
+_POSITIVE_RE = re.compile(r"\b(positive|enthusiastic|interested|impressed|pleased|receptive|excited|keen|happy|supportive|optimistic)\b", re.IGNORECASE)
+_NEGATIVE_RE = re.compile(r"\b(negative|skeptical|sceptical|concerned|hesitant|unhappy|dismissive|resistant|frustrated|doubtful|reluctant)\b", re.IGNORECASE)
+_NEUTRAL_RE = re.compile(r"\b(neutral|noncommittal|non-committal|undecided)\b", re.IGNORECASE)
+
+_HCP_NAME_RE = re.compile(r"\b(?:Dr\.?|Doctor)\s+([A-Z][a-zA-Z'\-]+)(?:\s+([A-Z][a-zA-Z'\-]+))?")
+# Capitalized words that follow a surname without being part of the name ("Met Dr. Patel Monday")
+_NOT_NAME_WORDS = {
+    *_WEEKDAYS, "today", "yesterday", "tomorrow",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december",
+    *_MONTHS, "sept",
+}
+_SENTENCE_END_RE = re.compile(r"[.!?;]\s+")
+# Words whose trailing period does not end a sentence ("Dr. Patel", "e.g. samples"); single initials are handled separately
+_ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "prof", "st", "jr", "sr", "vs", "approx", "dept", "no", "e.g", "i.e", "a.m", "p.m"}
+_TOPICS_RE = re.compile(r"\b(?:discussed|talked about|went over|reviewed|covered|presented)\s+(.+)", re.IGNORECASE)
+_FOLLOW_UP_RE = re.compile(r"\b(follow[- ]up|will send|need to|needs to|next step|promised to|agreed to|to send|schedule)\b", re.IGNORECASE)
+
+
+def _resolve_year(month: int, day: int, year: Optional[str], today: date) -> Optional[date]:
+    try:
+        if year:
+            return date(int(year), month, day)
+        # No year given: the most recent such date not in the future (notes describe past interactions)
+        candidate = date(today.year, month, day)
+        return candidate if candidate <= today else date(today.year - 1, month, day)
+    except ValueError:
+        return None
+
+
+def extract_date(text: str, today: date) -> Optional[str]:
+    """Resolve an explicit or relative interaction date to YYYY-MM-DD."""
+    found: Set[date] = set()
+    for y, m, d in _ISO_DATE_RE.findall(text):
+        try:
+            found.add(date(int(y), int(m), int(d)))
+        except ValueError:
+            pass
+    for m, d, y in _US_DATE_RE.findall(text):
+        try:
+            found.add(date(int(y), int(m), int(d)))
+        except ValueError:
+            pass
+    for month_name, day, year in _MONTH_DAY_RE.findall(text):
+        resolved = _resolve_year(_MONTHS[month_name.lower()[:3]], int(day), year, today)
+        if resolved:
+            found.add(resolved)
+    for day, month_name, year in _DAY_MONTH_RE.findall(text):
+        resolved = _resolve_year(_MONTHS[month_name.lower()[:3]], int(day), year, today)
+        if resolved:
+            found.add(resolved)
+    for word in _RELATIVE_DAY_RE.findall(text):
+        found.add(today - timedelta(days=1) if word.lower() == "yesterday" else today)
+    for amount in _DAYS_AGO_RE.findall(text):
+        days = _NUMBER_WORDS.get(amount.lower()) or int(amount)
+        found.add(today - timedelta(days=days))
+    for qualifier, weekday in _WEEKDAY_RE.findall(text):
+        # "Monday"/"on Monday"/"last Monday" all mean the most recent past Monday ("this Monday" may be today)
+        delta = (today.weekday() - _WEEKDAYS.index(weekday.lower())) % 7
+        if delta == 0 and qualifier.lower() != "this":
+            delta = 7
+        found.add(today - timedelta(days=delta))
+    # Only confident when every date expression in the note agrees
+    if len(found) == 1:
+        return found.pop().isoformat()
+    return None
+
+
+def extract_time(text: str) -> Optional[str]:
+    """Resolve "3pm", "3:30 PM", "15:00" or "noon" to HH:MM (24-hour)."""
+    found: Set[str] = set()
+    for hour, minute, meridiem in _AMPM_TIME_RE.findall(text):
+        hour_value = int(hour)
+        if not 1 <= hour_value <= 12:
+            continue
+        hour_value = hour_value % 12 + (12 if meridiem.lower() == "p" else 0)
+        found.add(f"{hour_value:02d}:{minute or '00'}")
+    for hour, minute in _24H_TIME_RE.findall(_AMPM_TIME_RE.sub(" ", text)):
+        found.add(f"{int(hour):02d}:{minute}")
+    if _NOON_RE.search(text):
+        found.add("12:00")
+    return found.pop() if len(found) == 1 else None
+
+
+def extract_interaction_type(text: str) -> Optional[str]:
+    matched = [label for label, pattern in _INTERACTION_TYPES if pattern.search(text)]
+    if "Virtual Meeting" in matched:
+        # "video call"/"zoom meeting" also match Call/Meeting; the more specific label wins
+        matched = [label for label in matched if label not in ("Call", "Meeting")]
+    return matched[0] if len(matched) == 1 else None
+
+
+def extract_sentiment(text: str) -> Optional[str]:
+    negated = bool(_NEGATED_POSITIVE_RE.search(text))
+    positive = bool(_POSITIVE_RE.search(_NEGATED_POSITIVE_RE.sub(" ", text)))
+    negative = bool(_NEGATIVE_RE.search(text)) or negated
+    neutral = bool(_NEUTRAL_RE.search(text))
+    labels = [label for label, hit in (("Positive", positive), ("Negative", negative), ("Neutral", neutral)) if hit]
+    return labels[0] if len(labels) == 1 else None
+
+
+def _hcp_name(first: str, second: str, catalog: CatalogIndex) -> str:
+    if second and (second.lower() in _NOT_NAME_WORDS or catalog.find_products(second)):
+        # "Dr. Patel Monday", "Dr. Johnson NeuroCalm": the second word is a date or product, not a given name/surname
+        return first
+    return f"{first} {second}" if second else first
+
+
+def extract_hcp_name(text: str, catalog: CatalogIndex) -> Optional[str]:
+    names = {_hcp_name(first, second, catalog) for first, second in _HCP_NAME_RE.findall(text)}
+    if len(names) != 1:
+        return None
+    name = f"Dr. {names.pop()}"
+    hcp = catalog.resolve_hcp(name)
+    return hcp.name if hcp else name
+
+
+def _sentences(text: str) -> List[str]:
+    sentences, start = [], 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if match.group().startswith("."):
+            words = text[start:match.start()].split()
+            last_word = words[-1].lstrip("(\"'").lower() if words else ""
+            if last_word in _ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+                continue
+        sentences.append(text[start:match.start() + 1])
+        start = match.end()
+    sentences.append(text[start:])
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def extract_topics(text: str) -> Optional[str]:
+    for sentence in _sentences(text):
+        match = _TOPICS_RE.search(sentence)
+        if match:
+            topics = match.group(1).strip().rstrip(".;")
+            return topics[0].upper() + topics[1:] if topics else None
+    return None
+
+
+def extract_follow_up(text: str) -> Optional[str]:
+    actions = [s.rstrip(";") for s in _sentences(text) if _FOLLOW_UP_RE.search(s)]
+    return " ".join(actions) if actions else None
+
+
+@dataclass
+class FastPathResult:
+    values: Dict[str, Any] = field(default_factory=dict)
+
+    def missing(self, fields: List[str]) -> List[str]:
+        return [name for name in fields if name not in self.values]
+
+    def confident(self) -> Dict[str, Any]:
+        """The resolved fields that take precedence over the LLM (everything but FAST_PATH_HEURISTIC_FIELDS)."""
+        return {name: value for name, value in self.values.items() if name not in FAST_PATH_HEURISTIC_FIELDS}
+
+
+def fast_extract(text: str, catalog: CatalogIndex, today: Optional[date] = None) -> FastPathResult:
+    """Resolve every field the rules are confident about; ambiguous fields are left for the LLM."""
+    today = today or date.today()
+    candidates = {
+        "hcpName": extract_hcp_name(text, catalog),
+        "interactionType": extract_interaction_type(text),
+        "date": extract_date(text, today),
+        "time": extract_time(text),
+        "productsDiscussed": catalog.find_products(text) or None,
+        "topicsDiscussed": extract_topics(text),
+        "hcpSentiment": extract_sentiment(text),
+        "followUpActions": extract_follow_up(text),
+    }
+    return FastPathResult(values={name: value for name, value in candidates.items() if value is not None})
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for savings reports."""
+    return max(1, len(text) // 4)
+
+
+class FastPathStats:
+    """Counts how often the LLM was skipped or trimmed and roughly how many tokens that saved."""
+
+    def __init__(self):
+        self.counts = {"requests": 0, "llm_skipped": 0, "llm_trimmed": 0, "llm_full": 0, "fields_resolved": 0, "estimated_tokens_saved": 0}
+
+    def record(self, outcome: str, fields_resolved: int, tokens_saved: int) -> None:
+        self.counts["requests"] += 1
+        self.counts[outcome] += 1
+        self.counts["fields_resolved"] += fields_resolved
+        self.counts["estimated_tokens_saved"] += tokens_saved
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.counts, "llm_calls_saved": self.counts["llm_skipped"], "required_fields": FAST_PATH_REQUIRED_FIELDS}
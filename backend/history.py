@@ -0,0 +1,211 @@
+# backend/history.py
+# Incrementally maintained per-HCP history rollup (the `hcp_history` table).
+# Every interaction insert folds the new row into its HCP's rollup, so summarize_history_tool reads a single row
+# instead of sorting the HCP's whole history. Edits recompute the affected HCPs from the raw table.
+#
+# CLI usage:
+#   python -m backend.history rebuild   # recompute every rollup from the interactions table
+#   python -m backend.history check     # report rollups that disagree with the interactions table
+import argparse
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .database import HcpHistory, Interaction, SessionLocal
+
+# Number of most recent interactions kept per HCP
+HISTORY_RECENT_LIMIT = int(os.getenv("HISTORY_RECENT_LIMIT", "5"))
+
+# Fields compared by the consistency check
+ROLLUP_FIELDS = ["interaction_count", "recent_interactions", "sentiment_counts", "products", "last_contact_date"]
+
+
+def history_entry(interaction: Interaction) -> Dict[str, Any]:
+    return {
+        "id": interaction.id,
+        "date": interaction.interaction_date,
+        "topics": interaction.topics_discussed,
+        "sentiment": interaction.hcp_sentiment,
+        "created_at": interaction.created_at.isoformat() if interaction.created_at else None,
+    }
+
+
+def _recency_key(entry: Dict[str, Any]):
+    return (entry["created_at"] or "", entry["id"] or 0)
+
+
+def fold_interaction(row: HcpHistory, interaction: Interaction) -> None:
+    """Fold one new interaction into an HCP rollup. JSON columns are reassigned, not mutated, so changes are tracked."""
+    row.interaction_count = (row.interaction_count or 0) + 1
+
+    recent = [history_entry(interaction), *(row.recent_interactions or [])]
+    recent.sort(key=_recency_key, reverse=True)
+    row.recent_interactions = recent[:HISTORY_RECENT_LIMIT]
+
+    if interaction.hcp_sentiment:
+        counts = dict(row.sentiment_counts or {})
+        counts[interaction.hcp_sentiment] = counts.get(interaction.hcp_sentiment, 0) + 1
+        row.sentiment_counts = counts
+
+    if interaction.products_discussed:
+        row.products = sorted(set(row.products or []) | set(interaction.products_discussed))
+
+    # interaction_date is YYYY-MM-DD, so string comparison orders chronologically
+    if interaction.interaction_date and (not row.last_contact_date or interaction.interaction_date > row.last_contact_date):
+        row.last_contact_date = interaction.interaction_date
+
+
+def empty_rollup(hcp_name: str) -> HcpHistory:
+    return HcpHistory(
+        hcp_name=hcp_name,
+        interaction_count=0,
+        recent_interactions=[],
+        sentiment_counts={},
+        products=[],
+        last_contact_date=None,
+    )
+
+
+def build_rollup(hcp_name: str, interactions: Iterable[Interaction]) -> HcpHistory:
+    """Compute a rollup from scratch (transient object, not added to any session)."""
+    row = empty_rollup(hcp_name)
+    for interaction in interactions:
+        fold_interaction(row, interaction)
+    return row
+
+
+def _hcp_interactions(session: Session, hcp_name: str):
+    return session.scalars(
+        select(Interaction)
+        .filter_by(hcp_name=hcp_name)
+        .order_by(Interaction.created_at, Interaction.id)
+        .execution_options(yield_per=500)
+    )
+
+
+def apply_inserted(session: Session, interactions: List[Interaction]) -> None:
+    """Fold newly inserted (already flushed) interactions into their HCP rollups.
+    Callers flush the interaction INSERT first, so the transaction already holds SQLite's write lock
+    and this read-modify-write cannot race another writer."""
+    rows: Dict[str, HcpHistory] = {}
+    for interaction in interactions:
+        hcp_name = interaction.hcp_name
+        if not hcp_name:
+            continue
+        row = rows.get(hcp_name)
+        if row is None:
+            # Create the rollup row if needed without a separate existence check
+            session.execute(
+                sqlite_insert(HcpHistory)
+                .values(hcp_name=hcp_name, interaction_count=0, recent_interactions=[], sentiment_counts={}, products=[])
+                .on_conflict_do_nothing(index_elements=["hcp_name"])
+            )
+            row = rows[hcp_name] = session.get(HcpHistory, hcp_name)
+        fold_interaction(row, interaction)
+
+
+def recompute_hcp(session: Session, hcp_name: str) -> None:
+    """Rebuild one HCP's rollup from the interactions table (used after edits, which can remove products/sentiments)."""
+    fresh = build_rollup(hcp_name, _hcp_interactions(session, hcp_name))
+    row = session.get(HcpHistory, hcp_name)
+    if fresh.interaction_count == 0:
+        if row is not None:
+            session.delete(row)
+        return
+    if row is None:
+        session.add(fresh)
+        return
+    for field in ROLLUP_FIELDS:
+        setattr(row, field, getattr(fresh, field))
+
+
+def apply_updated(session: Session, interactions: List[Interaction], previous_hcp_names: Iterable[Optional[str]]) -> None:
+    session.flush()
+    affected = {i.hcp_name for i in interactions} | set(previous_hcp_names)
+    for hcp_name in sorted(name for name in affected if name):
+        recompute_hcp(session, hcp_name)
+
+
+def rebuild_history(session: Session) -> int:
+    """Recompute every rollup from the interactions table in one streaming pass. Returns the number of HCPs."""
+    session.execute(delete(HcpHistory))
+    count = 0
+    current: Optional[HcpHistory] = None
+    interactions = session.scalars(
+        select(Interaction)
+        .where(Interaction.hcp_name.is_not(None))
+        .order_by(Interaction.hcp_name, Interaction.created_at, Interaction.id)
+        .execution_options(yield_per=1000)
+    )
+    for interaction in interactions:
+        if current is None or current.hcp_name != interaction.hcp_name:
+            current = empty_rollup(interaction.hcp_name)
+            session.add(current)
+            count += 1
+        fold_interaction(current, interaction)
+    return count
+
+
+def check_history_consistency(session: Session) -> Dict[str, Any]:
+    """Compare every stored rollup with one recomputed from the interactions table."""
+    stored = {row.hcp_name: row for row in session.scalars(select(HcpHistory))}
+    hcp_names = set(session.scalars(select(Interaction.hcp_name).where(Interaction.hcp_name.is_not(None)).distinct()))
+
+    mismatched, missing = [], []
+    for hcp_name in sorted(hcp_names):
+        row = stored.get(hcp_name)
+        if row is None:
+            missing.append(hcp_name)
+            continue
+        fresh = build_rollup(hcp_name, _hcp_interactions(session, hcp_name))
+        differing = [field for field in ROLLUP_FIELDS if getattr(row, field) != getattr(fresh, field)]
+        if differing:
+            mismatched.append({"hcp_name": hcp_name, "fields": differing})
+
+    orphaned = sorted(set(stored) - hcp_names)
+    return {
+        "checked": len(hcp_names),
+        "consistent": not (mismatched or missing or orphaned),
+        "mismatched": mismatched,
+        "missing": missing,
+        "orphaned": orphaned,
+    }
+
+
+def format_history_summary(row: Optional[HcpHistory]) -> str:
+    if row is None or not row.recent_interactions:
+        return "No previous interaction history available for this HCP in the database."
+    history_summary_parts = []
+    for i, entry in enumerate(row.recent_interactions):
+        history_summary_parts.append(
+            f"Interaction {i+1} on {entry['date']}: Discussed '{entry['topics'] or 'N/A'}'. Sentiment: {entry['sentiment'] or 'N/A'}."
+        )
+    return "Previous Interactions:\n" + "\n".join(history_summary_parts)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the per-HCP history rollup table.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args(argv)
+
+    from .database import create_db_and_tables
+    create_db_and_tables()
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            count = rebuild_history(db)
+            db.commit()
+            print(f"[history] Rebuilt rollups for {count} HCPs")
+        else:
+            report = check_history_consistency(db)
+            print(json.dumps(report, indent=2))
+            if not report["consistent"]:
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# backend/ingest.py
+# Bulk ingestion of historical interaction notes.
+# Extractions run with bounded parallelism; rows are written with batched inserts, one transaction per chunk,
+# and a checkpoint is saved after every committed chunk so an interrupted backfill can resume. Per-item results
+# are appended to the output file before each checkpoint, so a resumed run never loses or repeats them.
+# A resume does not revisit failed items: their indices are kept in the checkpoint, and the CLI exits non-zero
+# while any remain.
+#
+# CLI usage:
+#   python -m backend.ingest notes.ndjson --checkpoint notes.ckpt --output results.ndjson
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .database import Interaction, SessionLocal
+from .projections import record_inserted
+
+ExtractFn = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+def parse_ndjson_line(line: str) -> Optional[str]:
+    """Accept either a JSON string or an object with a `text` field per line; blank lines are skipped."""
+    line = line.strip()
+    if not line:
+        return None
+    item = json.loads(line)
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict) and isinstance(item.get("text"), str):
+        return item["text"]
+    raise ValueError("Each NDJSON line must be a JSON string or an object with a 'text' field")
+
+
+def read_ndjson_texts(lines: Iterable[str]) -> List[str]:
+    texts = []
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            text = parse_ndjson_line(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid NDJSON on line {line_number}: {e}")
+        if text is not None:
+            texts.append(text)
+    return texts
+
+
+def load_checkpoint(path: Optional[str]) -> Tuple[int, List[int]]:
+    """Return the index of the first item not yet processed (0 when there is no checkpoint) and the indices of
+    the items that failed before it."""
+    if not path or not os.path.exists(path):
+        return 0, []
+    with open(path) as f:
+        checkpoint = json.load(f)
+    return int(checkpoint.get("next_index", 0)), [int(index) for index in checkpoint.get("failed_indices", [])]
+
+
+def save_checkpoint(path: Optional[str], next_index: int, stats: Dict[str, Any]) -> None:
+    if not path:
+        return
+    # Write-then-rename so a crash never leaves a truncated checkpoint behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"next_index": next_index, **stats}, f)
+    os.replace(tmp_path, path)
+
+
+def bulk_insert_interactions(rows: List[Dict[str, Any]], ids: Optional[List[int]] = None) -> List[int]:
+    """Insert `rows` (column-value dicts) in a single transaction and return their IDs in input order.
+    Explicit `ids` are used when given (write-behind mode), otherwise SQLite assigns them."""
+    if not rows:
+        return []
+    if ids is not None:
+        rows = [{**row, "id": interaction_id} for row, interaction_id in zip(rows, ids)]
+    with SessionLocal() as db:
+        interactions = [Interaction(**row) for row in rows]
+        db.add_all(interactions)
+        # The ORM batches these into multi-row INSERT ... RETURNING statements
+        db.flush()
+        record_inserted(db, interactions)
+        db.commit()
+        return [interaction.id for interaction in interactions]
+
+
+def append_results(path: Optional[str], results: List[Dict[str, Any]]) -> None:
+    if not path:
+        return
+    with open(path, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+
+async def ingest_texts(
+    texts: List[str],
+    extract: ExtractFn,
+    concurrency: int = 8,
+    chunk_size: int = 200,
+    start_index: int = 0,
+    checkpoint_path: Optional[str] = None,
+    output_path: Optional[str] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    allocate_ids: Optional[Callable[[int], List[int]]] = None,
+    failed_indices: Optional[List[int]] = None,
+) -> Dict[str, Any]:
+    """Extract and persist `texts[start_index:]`, returning per-item results and throughput stats.
+
+    Each result is `{"index", "status": "ok", "id", "extracted_data"}` or `{"index", "status": "error", "error"}`.
+    With `output_path`, each chunk's results are appended to it as NDJSON before the chunk's checkpoint is saved.
+    `stats["failed_indices"]` lists every failed item, starting from `failed_indices` (earlier runs' failures).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, Any]] = []
+    stats = {"processed": 0, "succeeded": 0, "failed": 0, "failed_indices": list(failed_indices or [])}
+    started = time.perf_counter()
+
+    async def extract_one(index: int, text: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"index": index, "status": "ok", "extracted_data": await extract(text)}
+            except Exception as e:
+                return {"index": index, "status": "error", "error": str(e)}
+
+    for chunk_start in range(start_index, len(texts), chunk_size):
+        chunk = texts[chunk_start:chunk_start + chunk_size]
+        chunk_results = await asyncio.gather(
+            *(extract_one(chunk_start + offset, text) for offset, text in enumerate(chunk))
+        )
+
+        succeeded = [r for r in chunk_results if r["status"] == "ok"]
+        rows = [Interaction.column_values(r["extracted_data"]) for r in succeeded]
+        try:
+            # Run the blocking bulk insert off the event loop so extractions keep flowing
+            explicit_ids = allocate_ids(len(rows)) if allocate_ids and rows else None
+            ids = await asyncio.to_thread(bulk_insert_interactions, rows, explicit_ids)
+            for r, interaction_id in zip(succeeded, ids):
+                r["id"] = interaction_id
+        except Exception as e:
+            for r in succeeded:
+                r.update(status="error", error=f"Database write failed: {e}")
+                r.pop("extracted_data", None)
+
+        results.extend(chunk_results)
+        stats["processed"] += len(chunk_results)
+        stats["succeeded"] += sum(1 for r in chunk_results if r["status"] == "ok")
+        stats["failed"] += sum(1 for r in chunk_results if r["status"] == "error")
+        stats["failed_indices"] += [r["index"] for r in chunk_results if r["status"] == "error"]
+        elapsed = time.perf_counter() - started
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["items_per_second"] = round(stats["processed"] / elapsed, 2) if elapsed > 0 else 0.0
+
+        append_results(output_path, chunk_results)
+        next_index = chunk_start + len(chunk)
+        save_checkpoint(checkpoint_path, next_index, stats)
+        if progress:
+            progress({"next_index": next_index, "total": len(texts), **stats})
+
+    return {"results": results, "stats": stats}
+
+
+def print_progress(report: Dict[str, Any]) -> None:
+    print(
+        f"[ingest] {report['next_index']}/{report['total']} items, "
+        f"{report['items_per_second']} items/s, {report['failed']} errors"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-ingest interaction notes from an NDJSON file.")
+    parser.add_argument("path", help="NDJSON file: one JSON string or {\"text\": ...} object per line")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum concurrent LLM extractions")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Rows per bulk-insert transaction")
+    parser.add_argument("--checkpoint", help="Checkpoint file; ingestion resumes from it when present")
+    parser.add_argument("--output", help="Append per-item results to this NDJSON file")
+    args = parser.parse_args(argv)
+
+    # Imported here so `--help` works without an LLM configured
+    from .extraction import extract_and_enrich
+    from .database import create_db_and_tables
+
+    create_db_and_tables()
+    with open(args.path) as f:
+        texts = read_ndjson_texts(f)
+
+    start_index, failed_indices = load_checkpoint(args.checkpoint)
+    if start_index:
+        print(f"[ingest] Resuming from checkpoint at item {start_index}")
+
+    report = asyncio.run(ingest_texts(
+        texts,
+        extract_and_enrich,
+        concurrency=args.concurrency,
+        chunk_size=args.chunk_size,
+        start_index=start_index,
+        checkpoint_path=args.checkpoint,
+        output_path=args.output,
+        progress=print_progress,
+        failed_indices=failed_indices,
+    ))
+
+    stats = {key: value for key, value in report["stats"].items() if key != "failed_indices"}
+    print(f"[ingest] Done: {json.dumps(stats)}")
+    failed = report["stats"]["failed_indices"]
+    if failed:
+        print(f"[ingest] {len(failed)} item(s) failed and were not ingested; their indices are in the checkpoint "
+              f"(and errors in --output): {failed[:20]}{' ...' if len(failed) > 20 else ''}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
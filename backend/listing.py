@@ -0,0 +1,126 @@
+# backend/listing.py
+# Filtered, keyset-paginated interaction listing for GET /api/interactions.
+# Rows are ordered newest first by (interaction_day, id); interactions without a parseable date come last.
+# The cursor is the (interaction_day, id) of the last row returned, so every page is an index range scan
+# no matter how deep the client pages (no OFFSET).
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import Interaction, InteractionProduct
+
+LISTING_DEFAULT_LIMIT = 50
+LISTING_MAX_LIMIT = 200
+
+# Canonical spellings of the labels extraction produces; filters match them case-insensitively
+SENTIMENT_LABELS = ("Positive", "Negative", "Neutral")
+INTERACTION_TYPE_LABELS = ("Meeting", "Call", "Email", "Virtual Meeting")
+
+Cursor = Tuple[Optional[date], int]
+
+
+def _canonical_label(value: Optional[str], labels: Tuple[str, ...]) -> Optional[str]:
+    """The stored spelling of `value` ("positive" -> "Positive"); unknown values are kept as given."""
+    if not value:
+        return value
+    normalized = " ".join(value.split()).lower()
+    return next((label for label in labels if label.lower() == normalized), value)
+
+
+@dataclass
+class InteractionFilters:
+    hcp_name: Optional[str] = None
+    product: Optional[str] = None
+    sentiment: Optional[str] = None
+    interaction_type: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+    def __post_init__(self):
+        # Compared with == so the (sentiment|type, day, id) indexes stay usable
+        self.sentiment = _canonical_label(self.sentiment, SENTIMENT_LABELS)
+        self.interaction_type = _canonical_label(self.interaction_type, INTERACTION_TYPE_LABELS)
+
+    @property
+    def has_date_range(self) -> bool:
+        return self.date_from is not None or self.date_to is not None
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    day, interaction_id = cursor
+    payload = json.dumps([day.isoformat() if day else None, interaction_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Raises ValueError for a malformed cursor."""
+    try:
+        day, interaction_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return (date.fromisoformat(day) if day else None, int(interaction_id))
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def _page_query(filters: InteractionFilters, cursor: Optional[Cursor], dated: bool, limit: int):
+    """One segment of the listing: rows with a date (`dated`) or the undated tail, after `cursor`."""
+    if filters.product:
+        # Drive the query from the product index: (product, interaction_day, interaction_id) covers filter and order
+        day_column, id_column = InteractionProduct.interaction_day, InteractionProduct.interaction_id
+        query = (
+            select(Interaction)
+            .join(InteractionProduct, InteractionProduct.interaction_id == Interaction.id)
+            .where(InteractionProduct.product == filters.product)
+        )
+    else:
+        day_column, id_column = Interaction.interaction_day, Interaction.id
+        query = select(Interaction)
+
+    if filters.hcp_name:
+        query = query.where(Interaction.hcp_name == filters.hcp_name)
+    if filters.sentiment:
+        query = query.where(Interaction.hcp_sentiment == filters.sentiment)
+    if filters.interaction_type:
+        query = query.where(Interaction.interaction_type == filters.interaction_type)
+
+    if dated:
+        query = query.where(day_column.is_not(None))
+        if filters.date_from:
+            query = query.where(day_column >= filters.date_from)
+        if filters.date_to:
+            query = query.where(day_column <= filters.date_to)
+        if cursor is not None:
+            cursor_day, cursor_id = cursor
+            # The `<=` bound lets SQLite seek straight to the cursor position in the (day, id) index
+            query = query.where(day_column <= cursor_day, or_(day_column < cursor_day, id_column < cursor_id))
+        query = query.order_by(day_column.desc(), id_column.desc())
+    else:
+        query = query.where(day_column.is_(None))
+        if cursor is not None:
+            query = query.where(id_column < cursor[1])
+        query = query.order_by(id_column.desc())
+    return query.limit(limit)
+
+
+async def list_interactions(db: AsyncSession, filters: InteractionFilters, cursor: Optional[Cursor] = None, limit: int = LISTING_DEFAULT_LIMIT) -> Dict[str, Any]:
+    """One page of interactions matching `filters`, plus the cursor for the next page (None on the last page)."""
+    limit = max(1, min(limit, LISTING_MAX_LIMIT))
+    rows: List[Interaction] = []
+    # Dated rows first; then, unless a date range excludes them, the undated tail
+    if cursor is None or cursor[0] is not None:
+        rows = list(await db.scalars(_page_query(filters, cursor, dated=True, limit=limit + 1)))
+        cursor = None
+    if len(rows) <= limit and not filters.has_date_range:
+        rows += list(await db.scalars(_page_query(filters, cursor, dated=False, limit=limit + 1 - len(rows))))
+
+    page = rows[:limit]
+    next_cursor = encode_cursor((page[-1].interaction_day, page[-1].id)) if len(rows) > limit else None
+    return {
+        "items": [{"id": row.id, **row.to_dict(), "createdAt": row.created_at.isoformat() if row.created_at else None} for row in page],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,129 @@
+# backend/llm.py
+# Pluggable chat-model backend for the extraction chains, selected with LLM_PROVIDER:
+#   groq  (default) ChatGroq; langchain_groq is imported and GROQ_API_KEY checked on first use, not at import
+#   fake  deterministic, offline stand-in built on the rule-based fast path; optional simulated latency
+#         (LLM_FAKE_LATENCY_MS, LLM_FAKE_JITTER_MS) for load tests and local development
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Dict, Optional
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+
+_DESCRIPTION_RE = re.compile(r"Interaction description:\s*(.*)", re.DOTALL)
+
+
+class LLMProvider:
+    """A named chat model. `model_name` is part of the extraction cache key, so answers from
+    different providers/models are never served for one another."""
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._chat_model = None
+
+    def chat_model(self):
+        """The LangChain runnable (prompt value -> AI message) used by the extraction chains; built once."""
+        if self._chat_model is None:
+            self._chat_model = self._build()
+        return self._chat_model
+
+    def _build(self):
+        raise NotImplementedError
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self, model_name: str = "gemma2-9b-it", api_key: Optional[str] = None):
+        super().__init__(model_name)
+        self.api_key = api_key if api_key is not None else os.getenv("GROQ_API_KEY")
+
+    def _build(self):
+        if not self.api_key:
+            raise ValueError(
+                "GROQ_API_KEY environment variable not set. "
+                "Please set it to your Groq API key before running the application (or set LLM_PROVIDER=fake)."
+                "\n\nExample (Linux/macOS): export GROQ_API_KEY='your_api_key_here'"
+                "\nExample (Windows CMD): set GROQ_API_KEY='your_api_key_here'"
+                "\nExample (Windows PowerShell): $env:GROQ_API_KEY='your_api_key_here'"
+            )
+        from langchain_groq import ChatGroq
+        return ChatGroq(model=self.model_name, temperature=0, groq_api_key=self.api_key)
+
+
+class FakeProvider(LLMProvider):
+    """Answers extraction prompts without a network call: the fast-path rules fill what they can and
+    the rest gets fixed placeholders, so the same note always produces the same JSON."""
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0):
+        super().__init__("fake-deterministic")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def delay_seconds(self, text: str) -> float:
+        """Simulated latency; the jitter is seeded by the note text so it is reproducible."""
+        if not self.jitter_ms:
+            return self.latency_ms / 1000
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+        return max(self.latency_ms + random.Random(seed).uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+
+    @staticmethod
+    def answer(text: str) -> Dict[str, Any]:
+        from .catalog import catalog_store
+        from .fast_path import fast_extract
+
+        values = fast_extract(text, catalog_store.index).values
+        summary = " ".join(text.split())[:200]
+        return {
+            "interactionType": "Meeting",
+            "topicsDiscussed": summary or None,
+            "hcpSentiment": "Neutral",
+            **values,
+        }
+
+    def respond(self, prompt_value):
+        from langchain_core.messages import AIMessage
+
+        prompt_text = prompt_value.to_string()
+        match = _DESCRIPTION_RE.search(prompt_text)
+        text = match.group(1).strip() if match else prompt_text
+        content = json.dumps(self.answer(text))
+        input_tokens, output_tokens = max(1, len(prompt_text) // 4), max(1, len(content) // 4)
+        return AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens},
+        ), text
+
+    def _build(self):
+        from langchain_core.runnables import RunnableLambda
+
+        def invoke(prompt_value):
+            message, text = self.respond(prompt_value)
+            time.sleep(self.delay_seconds(text))
+            return message
+
+        async def ainvoke(prompt_value):
+            message, text = self.respond(prompt_value)
+            await asyncio.sleep(self.delay_seconds(text))
+            return message
+
+        return RunnableLambda(invoke, afunc=ainvoke, name="FakeChatModel")
+
+
+def llm_provider_from_env() -> LLMProvider:
+    if LLM_PROVIDER == "fake":
+        return FakeProvider(
+            latency_ms=float(os.getenv("LLM_FAKE_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("LLM_FAKE_JITTER_MS", "0")),
+        )
+    if LLM_PROVIDER == "groq":
+        return GroqProvider(model_name=os.getenv("GROQ_MODEL", "gemma2-9b-it"))
+    raise ValueError(f"Unknown LLM_PROVIDER {LLM_PROVIDER!r}; expected 'groq' or 'fake'")
@@ -1,29 +1,79 @@
 # backend/main.py
 # Core Imports and App Initialization
-from fastapi import FastAPI, Request, HTTPException, Depends
+# Only lightweight modules are imported here. The LangChain/LangGraph stack (backend.extraction, backend.agent)
+# is loaded on the first request, or during startup when WARM_LLM_STACK=1, so workers boot fast and offline.
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, Request, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from datetime import date, datetime
 from typing import List, Dict, Any, Optional
-
-# LangGraph State Schema
-from typing_extensions import TypedDict, Annotated
-from langgraph.graph.message import add_messages
+import asyncio
 import json
 import os
 
-# LangChain and Groq imports
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
-from langgraph.graph import StateGraph
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-
 # --- NEW: Import from database.py ---
-from sqlalchemy.orm import Session # For type hinting the db session
-from .database import create_db_and_tables, get_db, Interaction # Import your DB utilities and Model
-from sqlalchemy import select # For querying data
+from .database import create_db_and_tables, get_async_db, graph_session, engine, async_engine, Interaction, AsyncSessionLocal # Import your DB utilities
+from sqlalchemy.ext.asyncio import AsyncSession
+from .admission import AdmissionRejected, admission_from_env
+from .ingest import ingest_texts, read_ndjson_texts
+from .listing import LISTING_DEFAULT_LIMIT, InteractionFilters, decode_cursor, list_interactions
+from . import rollups
+from .export import EXPORT_FORMATS, export_interactions, export_watermark, to_naive_utc
+from .search import SEARCH_DEFAULT_LIMIT, SearchQueryError, search_interactions
+from .catalog import catalog_store
+from .sessions import InteractionNotFound, explicit_patch, session_store_from_env
+from .write_behind import WriteBehindWriter, write_behind_from_env
+from .telemetry import ADMISSION_REJECTED, RequestTelemetryMiddleware, instrument_engine, log_event, registry
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+# Import the LangChain/LangGraph modules during startup instead of on the first request
+WARM_LLM_STACK = os.getenv("WARM_LLM_STACK", "0") == "1"
+# Startup (imports + lifespan setup) taking longer than this is logged as a warning
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
+
+def llm_stack():
+    """The lazily imported extraction and agent modules (imported once, then served from sys.modules)."""
+    from . import agent, extraction
+    return agent, extraction
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global interaction_writer
+    startup_started = time.perf_counter()
+    log_event("Creating SQLite database tables if they don't exist...")
+    create_db_and_tables()
+    catalog_store.load()
+    log_event("SQLite database tables created/checked.")
+
+    interaction_writer = write_behind_from_env()
+    if interaction_writer is not None:
+        await interaction_writer.start()
+        log_event("Write-behind persistence enabled.", batch_size=interaction_writer.batch_size)
 
-app = FastAPI(title="PharmaGPT API")
+    if WARM_LLM_STACK:
+        warm_started = time.perf_counter()
+        llm_stack()
+        log_event("LLM stack imported.", import_ms=round((time.perf_counter() - warm_started) * 1000))
+
+    startup_ms = (IMPORT_SECONDS + time.perf_counter() - startup_started) * 1000
+    log_event("Startup complete.", startup_ms=round(startup_ms), import_ms=round(IMPORT_SECONDS * 1000))
+    if startup_ms > STARTUP_BUDGET_MS:
+        log_event("Startup exceeded its time budget.", level="warning", budget_ms=STARTUP_BUDGET_MS)
+
+    yield
+
+    # Flush queued write-behind rows before the worker exits
+    if interaction_writer is not None:
+        await interaction_writer.stop()
+        log_event("Write-behind queue flushed.", **interaction_writer.snapshot())
+
+app = FastAPI(title="PharmaGPT API", lifespan=lifespan)
 
 # Configure CORS for FastAPI app.
 app.add_middleware(
@@ -32,33 +82,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Export-Watermark"],
 )
 
-# Initialize Groq LLM
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError(
-        "GROQ_API_KEY environment variable not set. "
-        "Please set it to your Groq API key before running the application."
-        "\n\nExample (Linux/macOS): export GROQ_API_KEY='your_api_key_here'"
-        "\nExample (Windows CMD): set GROQ_API_KEY='your_api_key_here'"
-        "\nExample (Windows PowerShell): $env:GROQ_API_KEY='your_api_key_here'"
-    )
+# SQL statement timings for both the sync (startup, CLIs, write-behind) and async (request path) engines
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
 
-llm_extraction = ChatGroq(model="gemma2-9b-it", temperature=0, groq_api_key=GROQ_API_KEY)
-
-# Pydantic Models for API Input/Output and LLM Extraction
-class ExtractedInteractionData(BaseModel):
-    hcpName: Optional[str] = Field(None, description="Name of the Healthcare Professional (HCP)")
-    interactionType: Optional[str] = Field(None, description="Type of interaction (e.g., Meeting, Call, Email)")
-    date: Optional[str] = Field(None, description="Date of the interaction in YYYY-MM-DD format")
-    time: Optional[str] = Field(None, description="Time of the interaction in HH:MM format (24-hour format)")
-    productsDiscussed: Optional[List[str]] = Field(None, description="List of pharmaceutical products discussed")
-    topicsDiscussed: Optional[str] = Field(None, description="Summary of key topics discussed during the interaction")
-    materialsShared: Optional[List[Dict[str, str]]] = Field(None, description="List of materials explicitly mentioned as shared, each with 'id' and 'name' fields.")
-    hcpSentiment: Optional[str] = Field(None, description="HCP's overall sentiment towards the discussion (e.g., Positive, Negative, Neutral)")
-    followUpActions: Optional[str] = Field(None, description="Specific follow-up actions required after the interaction")
+# Trace IDs and per-route request timings
+app.add_middleware(RequestTelemetryMiddleware)
 
+# Pydantic Models for API Input/Output
 class InteractionInput(BaseModel):
     text: str
     context: Optional[Dict[str, Any]] = None
@@ -67,331 +101,398 @@ class InteractionResponse(BaseModel):
     message: str
     extracted_data: Dict[str, Any]
     suggested_followups: List[str]
+    interaction_id: Optional[int] = None
+    session_id: Optional[str] = None # Send back as context["session_id"] (with "is_edit": true) to edit this interaction
+    updated_fields: List[str] = []
 
-# LangGraph State Schema
-class GraphState(TypedDict):
-    input: str
-    context: Dict[str, Any]
-    extracted_data: Dict[str, Any]
-    suggested_followups: List[str]
-    history_summary: str
-    suggested_resources: List[str]
-
-# --- Mock Databases for Demo Purposes (can be replaced by DB later if needed) ---
-hcp_database = {
-    "Dr. Patel": {"specialty": "Oncology", "preferences": "Prefers morning meetings"},
-    "Dr. Smith": {"specialty": "Cardiology", "preferences": "Likes clinical data"},
-    "Dr. Johnson": {"specialty": "Neurology", "preferences": "Interested in new trials"}
-}
+# Concurrency limit, queue depth and time budget for LLM-backed requests (configured via env)
+extraction_admission = admission_from_env()
 
-materials_database = {
-    "OncoBoost": ["Phase III trial results", "Patient selection guide", "Dosing information"],
-    "CardioPlus": ["Efficacy data", "Comparison chart", "Safety profile"],
-    "NeuroCalm": ["Clinical outcomes", "Patient case studies", "Administration guide"]
-}
+# Background group-commit writer, created at startup when INTERACTION_WRITE_MODE=write_behind
+interaction_writer: Optional[WriteBehindWriter] = None
 
-# LLM Chain for Log Interaction (Groq-Powered)
-log_interaction_prompt = ChatPromptTemplate.from_messages([
-    ("system", """You are an expert AI assistant for pharmaceutical sales representatives. Your task is to extract all relevant details from the provided natural language description of an HCP interaction.
-
-    Extract the following fields accurately and precisely. If a piece of information is not explicitly mentioned or clearly inferable, omit that field (do not include it in the JSON) or set its value to null.
-
-    Ensure the output is a valid JSON object matching the following Pydantic schema:
-    {json_schema}
-
-    Here are some specific guidelines:
-    - 'hcpName': Full name of the Healthcare Professional.
-    - 'interactionType': Examples: 'Meeting', 'Call', 'Email', 'Virtual Meeting'.
-    - 'date': Extract the exact date in YYYY-MM-DD format. If only a day of the week is given (e.g., 'yesterday', 'Monday'), try to infer the date relative to today's date if possible, otherwise omit.
-    - 'time': Extract the exact time in HH:MM (24-hour) format. If 'AM'/'PM' is used, convert it.
-    - 'productsDiscussed': A list of specific pharmaceutical product names mentioned.
-    - 'topicsDiscussed': A concise summary of the key subjects or themes covered during the interaction.
-    - 'materialsShared': A list of materials explicitly mentioned as being shared. Each item should have an 'id' (which can be the material name or a placeholder if no ID is clear) and 'name' (the material's title). For example: [{{ "id": "Clinical Data", "name": "ProductX Clinical Study Results" }}]
-    - 'hcpSentiment': Assess the overall sentiment of the HCP towards the discussion. Choose from 'Positive', 'Negative', or 'Neutral'.
-    - 'followUpActions': Clearly state any specific actions the sales rep needs to take as a direct result of this interaction.
-
-    Example of expected JSON for a simple interaction:
-    {{
-        "hcpName": "Dr. Sarah Lee",
-        "interactionType": "Meeting",
-        "date": "2024-05-20",
-        "time": "14:00",
-        "productsDiscussed": ["ProductX"],
-        "topicsDiscussed": "Discussed new clinical data for ProductX and its side effect profile.",
-        "materialsShared": [{{ "id": "Clinical Data", "name": "ProductX Clinical Study Results" }}],
-        "hcpSentiment": "Positive",
-        "followUpActions": "Send follow-up email with detailed safety profile."
-    }}
-    """),
-    ("human", "Interaction description: {interaction_text}")
-])
-
-llm_extraction_chain = (
-    log_interaction_prompt.partial(json_schema=ExtractedInteractionData.schema_json())
-    | llm_extraction
-    | JsonOutputParser(pydantic_object=ExtractedInteractionData)
-)
-
-# --- LangGraph Tool Functions (Modified to accept config for DB session) ---
-# Each tool now expects `config` to access the database session.
+# Drafts of logged interactions, so follow-up edits patch them without another extraction
+session_store = session_store_from_env()
 
-async def log_interaction_tool(state: GraphState, config: dict) -> Dict[str, Any]:
-    """Extract interaction details from natural language input using an LLM (Groq) and save to DB."""
-    db: Session = config["configurable"]["db_session"] # Get session from config
-    input_text = state["input"]
+# Queue depth and in-flight gauges, read when /metrics is scraped
+registry.gauge("admission_in_flight", "Requests holding an extraction slot.", callback=lambda: {(): extraction_admission.in_flight})
+registry.gauge("admission_waiting", "Requests queued for an extraction slot.", callback=lambda: {(): extraction_admission.waiting})
+registry.gauge(
+    "write_behind_queue_depth", "Interactions queued for the next group commit.",
+    callback=lambda: {(): interaction_writer.queue.qsize()} if interaction_writer is not None else {},
+)
 
+# --- API Endpoints ---
+def initial_graph_state(input_data: InteractionInput) -> Dict[str, Any]:
+    return {
+        "input": input_data.text,
+        "context": input_data.context or {},
+        "extracted_data": {}, 
+        "suggested_followups": [],
+        "history_summary": "",
+        "suggested_resources": [],
+        "interaction_id": None,
+        "updated_fields": [],
+    }
+
+async def load_session_state(input_data: InteractionInput):
+    """Initial graph state plus the session ID for this request. Edits (context["is_edit"]) start from the
+    session's stored draft, or from the row named by context["interaction_id"], so routing skips extraction.
+    Raises HTTPException: 400 for a malformed interaction_id or patch, 404 when there is no draft to edit."""
+    context = input_data.context or {}
+    state = initial_graph_state(input_data)
+    session_id = context.get("session_id") or session_store.new_session_id()
+    if not context.get("is_edit", False):
+        return session_id, state
+
+    interaction_id = context.get("interaction_id")
+    if interaction_id is not None:
+        try:
+            interaction_id = int(interaction_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="context.interaction_id must be an integer")
     try:
-        print(f"Calling Groq LLM with input: {input_text[:100]}...")
-        extracted_data_llm = llm_extraction_chain.invoke({"interaction_text": input_text})
-        
-        # Convert Pydantic model to dictionary, excluding unset fields
-        extracted_data = extracted_data_llm.dict(exclude_unset=True)
-
-        # Mock logic for materials suggestion (can be replaced with DB later)
-        if "productsDiscussed" in extracted_data and not extracted_data.get("materialsShared"):
-            materials_shared = []
-            for product in extracted_data["productsDiscussed"]:
-                if product in materials_database:
-                    if materials_database[product]:
-                        # Taking the first material as a default example
-                        materials_shared.append({"id": product, "name": materials_database[product][0]})
-            if materials_shared:
-                extracted_data["materialsShared"] = materials_shared
-        
-        # --- NEW: Save extracted data to SQLite ---
-        new_interaction = Interaction(
-            hcp_name=extracted_data.get("hcpName"),
-            interaction_type=extracted_data.get("interactionType"),
-            interaction_date=extracted_data.get("date"),
-            interaction_time=extracted_data.get("time"),
-            products_discussed=extracted_data.get("productsDiscussed"), # SQLite can store JSON
-            topics_discussed=extracted_data.get("topicsDiscussed"),
-            materials_shared=extracted_data.get("materialsShared"), # SQLite can store JSON
-            hcp_sentiment=extracted_data.get("hcpSentiment"),
-            follow_up_actions=extracted_data.get("followUpActions")
-        )
-        db.add(new_interaction)
-        db.commit() # Commit the transaction
-        db.refresh(new_interaction) # Refresh to get ID and other defaults
-        print(f"Interaction logged to DB with ID: {new_interaction.id}")
-
-        return {"extracted_data": extracted_data}
-
-    except Exception as e:
-        db.rollback() # Rollback on error
-        print(f"Error during Groq LLM extraction or DB save in log_interaction_tool: {e}")
-        raise # Re-raise to propagate the error
-
-async def edit_interaction_tool(state: GraphState, config: dict) -> Dict[str, Any]:
-    """Update only specific fields in the interaction form (in the current extracted_data).
-    To edit a specific DB record, you would need an ID passed in the context."""
-    db: Session = config["configurable"]["db_session"] # Get session from config
-    input_text = state["input"]
-    context = state.get("context", {})
-    extracted_data = state.get("extracted_data", {}) # This is the current in-memory data from the previous step
-
-    # This logic is still operating on the *current* extracted_data in the agent's state.
-    # To edit a *database record*, you would need to:
-    # 1. Have an `interaction_id` in the `context` or `state`.
-    # 2. Query the database for that specific interaction using `db.query(Interaction).filter_by(id=interaction_id).first()`.
-    # 3. Update its attributes: `db_interaction.hcp_sentiment = "Positive"`.
-    # 4. `db.commit()` and `db.refresh()`.
-
-    # For now, keeping the in-memory edit behavior for simplicity, as editing a specific record
-    # implies more complex UI/agent flow to identify *which* record to edit.
-    if context.get("is_edit", False):
-        # Example: if the user explicitly says "change sentiment to positive" for the *current* interaction
-        if "sentiment" in input_text.lower():
-            if "positive" in input_text.lower():
-                extracted_data["hcpSentiment"] = "Positive"
-            elif "negative" in input_text.lower():
-                extracted_data["hcpSentiment"] = "Negative"
-            elif "neutral" in input_text.lower():
-                extracted_data["hcpSentiment"] = "Neutral"
-        
-        if "date" in input_text.lower():
-            if "april 20" in input_text.lower():
-                extracted_data["date"] = "2025-04-20"
-            elif "april 21" in input_text.lower():
-                extracted_data["date"] = "2025-04-21"
-        
-    return {"extracted_data": extracted_data}
-
-async def suggest_followup_tool(state: GraphState, config: dict) -> Dict[str, Any]:
-    """Generate follow-up suggestions based on the interaction context."""
-    # This tool still uses mock HCP data; you could integrate a separate HCP table if needed.
-    extracted_data = state.get("extracted_data", {})
-
-    followups = []
-    hcp_name = extracted_data.get("hcpName", "")
-    topics = extracted_data.get("topicsDiscussed", "").lower() if extracted_data.get("topicsDiscussed") else ""
-    sentiment = extracted_data.get("hcpSentiment", "")
-
-    if hcp_name in hcp_database: # Uses mock hcp_database
-        specialty = hcp_database[hcp_name]["specialty"]
-        preferences = hcp_database[hcp_name]["preferences"]
-        
-        followups.append(f"Schedule next meeting according to {hcp_name}'s preference: {preferences}")
-        
-        if specialty == "Oncology" and "oncoboost" in topics:
-            followups.append("Share the latest patient outcomes data for OncoBoost in similar cancer types")
-        elif specialty == "Cardiology" and "cardio" in topics:
-            followups.append("Provide comparative efficacy data for CardioPlus vs. standard of care")
-        elif specialty == "Neurology" and "neuro" in topics:
-            followups.append("Follow up with new clinical trial enrollment information")
+        explicit_patch(context.get("patch"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    draft = await session_store.get(session_id) if context.get("session_id") else None
+    if draft is None and interaction_id is not None:
+        async with AsyncSessionLocal() as db:
+            row = await db.get(Interaction, interaction_id)
+        if row is not None:
+            draft = {"interaction_id": row.id, "extracted_data": {name: value for name, value in row.to_dict().items() if value is not None}}
+    if draft is None:
+        # Never fall back to extraction: that would log the edit text as a new interaction
+        raise HTTPException(status_code=404, detail="No interaction to edit: the session has expired or the interaction does not exist.")
+    state["extracted_data"] = dict(draft["extracted_data"])
+    state["interaction_id"] = draft["interaction_id"]
+    return session_id, state
+
+async def remember_session(session_id: str, result: Dict[str, Any]) -> None:
+    if result.get("interaction_id") is not None:
+        await session_store.save(session_id, result["interaction_id"], result.get("extracted_data", {}))
+
+def graph_config(db) -> Dict[str, Any]:
+    # Tools get the DB session (and the write-behind writer, if enabled) through the run config
+    return {"configurable": {"db_session": db, "interaction_writer": interaction_writer}}
+
+def build_response(result: Dict[str, Any], session_id: Optional[str] = None, draft_edit: bool = False) -> InteractionResponse:
+    """Turn the agent's final state into the API response, with a user-friendly message."""
+    # Extract the final data from the agent's state
+    extracted_data = result.get("extracted_data", {})
+    suggested_followups = result.get("suggested_followups", [])
+    history_summary = result.get("history_summary", "")
+    suggested_resources = result.get("suggested_resources", [])
     
-    if sentiment == "Positive":
-        followups.append("Send thank you email with additional resources discussed")
-        followups.append("Invite to upcoming product symposium")
-    elif sentiment == "Negative":
-        followups.append("Schedule call to address concerns")
-        followups.append("Share additional safety data to address hesitations")
+    # Construct a user-friendly response message
+    hcp_name = extracted_data.get("hcpName") or "the HCP"
+    updated_fields = result.get("updated_fields") or []
+    if updated_fields:
+        response_message = f"I've updated {', '.join(updated_fields)} for your interaction with {hcp_name}."
+    elif draft_edit:
+        response_message = f"I didn't find any changes to apply to your interaction with {hcp_name}."
     else:
-        followups.append("Share additional clinical data that may help with decision making")
-        followups.append("Schedule follow-up call in 2 weeks to continue the discussion")
-    
-    while len(followups) < 2:
-        followups.append("Schedule routine follow-up in 4-6 weeks")
-    
-    return {"suggested_followups": followups[:3]}
-
-async def summarize_history_tool(state: GraphState, config: dict) -> Dict[str, Any]:
-    """Summarize previous interactions with this HCP (from DB)."""
-    db: Session = config["configurable"]["db_session"] # Get session from config
-    hcp_name = state.get("extracted_data", {}).get("hcpName")
-    
-    if hcp_name:
-        # Query interactions for this HCP from SQLite
-        # Using .scalars().all() for SQLAlchemy 2.0 style `select`
-        interactions_query = db.execute(
-            select(Interaction)
-            .filter_by(hcp_name=hcp_name)
-            .order_by(Interaction.created_at.desc())
-            .limit(5) # Get last 5 interactions
-        )
-        past_interactions = interactions_query.scalars().all()
-
-        if past_interactions:
-            history_summary_parts = []
-            for i, interaction in enumerate(past_interactions):
-                history_summary_parts.append(
-                    f"Interaction {i+1} on {interaction.interaction_date}: Discussed '{interaction.topics_discussed or 'N/A'}'. Sentiment: {interaction.hcp_sentiment or 'N/A'}."
-                )
-            return {"history_summary": "Previous Interactions:\n" + "\n".join(history_summary_parts)}
-        else:
-            return {"history_summary": "No previous interaction history available for this HCP in the database."}
-    else:
-        return {"history_summary": "No HCP name provided to summarize history."}
-
-async def suggest_resources_tool(state: GraphState, config: dict) -> Dict[str, Any]:
-    """Suggest relevant resources based on the interaction topics (using mock data)."""
-    # This tool still uses mock materials data; you could integrate a separate materials table if needed.
-    extracted_data = state.get("extracted_data", {})
-    topics = extracted_data.get("topicsDiscussed", "").lower() if extracted_data.get("topicsDiscussed") else ""
-    products_discussed = extracted_data.get("productsDiscussed", [])
-    
-    suggested_resources = []
+        response_message = f"I've processed your interaction with {hcp_name}."
     
-    for product in products_discussed:
-        if product in materials_database: # Uses mock materials_database
-            suggested_resources.extend(materials_database[product])
-
-    if not suggested_resources:
-        if "oncoboost" in topics:
-            suggested_resources.extend(materials_database.get("OncoBoost", []))
-        elif "cardio" in topics:
-            suggested_resources.extend(materials_database.get("CardioPlus", []))
-        elif "neuro" in topics:
-            suggested_resources.extend(materials_database.get("NeuroCalm", []))
+    if history_summary and history_summary != "No previous interaction history available for this HCP in the database." and history_summary != "No HCP name provided to summarize history.":
+        response_message += f" {history_summary}"
     
-    if not suggested_resources:
-        suggested_resources = [
-            "Company overview brochure",
-            "Product catalog",
-            "Recent publications list"
-        ]
+    if suggested_resources:
+        response_message += f" Based on your discussion, you might want to share: {', '.join(suggested_resources[:2])}."
     
-    return {"suggested_resources": list(set(suggested_resources))[:3]}
+    return InteractionResponse(
+        message=response_message,
+        extracted_data=extracted_data,
+        suggested_followups=suggested_followups,
+        interaction_id=result.get("interaction_id"),
+        session_id=session_id,
+        updated_fields=updated_fields,
+    )
 
-# --- Create the LangGraph Agent ---
-# The tool functions are now designed to accept a `config` dictionary.
-# This config will carry the database session.
-def create_interaction_agent():
-    workflow = StateGraph(GraphState) 
-    
-    # Pass the tool functions directly; they will expect `state` and `config`
-    workflow.add_node("log_interaction", log_interaction_tool)
-    workflow.add_node("edit_interaction", edit_interaction_tool)
-    workflow.add_node("suggest_followup", suggest_followup_tool)
-    workflow.add_node("summarize_history", summarize_history_tool)
-    workflow.add_node("suggest_resources", suggest_resources_tool)
-    
-    workflow.add_edge("log_interaction", "edit_interaction")
-    workflow.add_edge("edit_interaction", "suggest_followup")
-    workflow.add_edge("suggest_followup", "summarize_history")
-    workflow.add_edge("summarize_history", "suggest_resources")
-    
-    workflow.set_entry_point("log_interaction")
+@app.post("/api/interactions/process", response_model=InteractionResponse)
+async def process_interaction(input_data: InteractionInput):
+    try:
+        session_id, initial_state = await load_session_state(input_data)
+        
+        # Invoke the LangGraph agent with an async session scoped to this graph run (rolled back on error).
+        # Admission control bounds concurrent extractions and enforces the per-request time budget;
+        # edits of a stored draft make no LLM call and skip it.
+        agent, _ = llm_stack()
+        async with graph_session() as db:
+            run = agent.interaction_agent.ainvoke( # Use ainvoke for async graph
+                initial_state,
+                config=graph_config(db) # Pass db session here
+            )
+            draft_edit = agent.route_entry(initial_state) == "edit_interaction"
+            result = await (run if draft_edit else extraction_admission.run(run))
+        
+        await remember_session(session_id, result)
+        return build_response(result, session_id, draft_edit)
     
-    return workflow.compile()
+    except HTTPException:
+        raise
 
-# Initialize the LangGraph agent when the app starts
-interaction_agent = create_interaction_agent()
+    except InteractionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-# --- API Endpoints ---
-# Add a startup event to create database tables
-@app.on_event("startup")
-def on_startup(): # Changed to synchronous for SQLite
-    print("Creating SQLite database tables if they don't exist...")
-    create_db_and_tables()
-    print("SQLite database tables created/checked.")
+    except AdmissionRejected as e:
+        log_event("Interaction rejected by admission control", level="warning", status=e.status_code, detail=e.detail)
+        ADMISSION_REJECTED.inc(status=str(e.status_code))
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers())
 
+    except Exception as e:
+        log_event("Full error processing interaction", level="error", error=str(e))
+        raise HTTPException(status_code=500, detail=f"An internal error occurred while processing your request. Please try again or rephrase. Error: {str(e)}")
 
-@app.post("/api/interactions/process", response_model=InteractionResponse)
-async def process_interaction(input_data: InteractionInput, db: Session = Depends(get_db)): # Inject synchronous DB session
+# Which streamed frame each graph node produces, and the state key it carries
+STREAM_EVENTS = {
+    "log_interaction": "extracted_data",
+    "edit_interaction": "extracted_data",
+    "suggest_followup": "suggested_followups",
+    "summarize_history": "history_summary",
+    "suggest_resources": "suggested_resources",
+}
+
+def format_stream_frame(event: str, data: Any, sse: bool) -> str:
+    payload = json.dumps({"event": event, "data": data})
+    if sse:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@app.post("/api/interactions/process/stream")
+async def process_interaction_stream(input_data: InteractionInput, request: Request):
+    """Streaming variant of /api/interactions/process.
+    Emits one frame per graph node as soon as it finishes (extracted form fields first), then a `final` frame
+    with the same payload as the non-streaming endpoint. Responds with SSE when the client accepts
+    `text/event-stream`, otherwise with NDJSON."""
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    agent, _ = llm_stack()
+    session_id, initial_state = await load_session_state(input_data)
+
+    # Admit before the response starts so rejections are still plain 429/503 responses (edits need no slot)
+    draft_edit = agent.route_entry(initial_state) == "edit_interaction"
+    slot = nullcontext() if draft_edit else extraction_admission.slot()
     try:
-        initial_state: GraphState = {
-            "input": input_data.text,
-            "context": input_data.context or {},
-            "extracted_data": {}, 
-            "suggested_followups": [],
-            "history_summary": "",
-            "suggested_resources": []
-        }
-        
-        # Invoke the LangGraph agent, passing the synchronous database session via config
-        # FastAPI will handle running this synchronous `db` operation in a thread pool.
-        result = await interaction_agent.ainvoke( # Use ainvoke for async graph
-            initial_state,
-            config={"configurable": {"db_session": db}} # Pass db session here
+        await slot.__aenter__()
+    except AdmissionRejected as e:
+        log_event("Interaction rejected by admission control", level="warning", status=e.status_code, detail=e.detail)
+        ADMISSION_REJECTED.inc(status=str(e.status_code))
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers())
+
+    async def frames():
+        # The session lives as long as the stream, not the request handler
+        db = AsyncSessionLocal()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + extraction_admission.timeout_seconds
+        final_state: Dict[str, Any] = initial_state
+        updates = agent.interaction_agent.astream(
+            final_state,
+            config=graph_config(db),
+            stream_mode="updates",
         )
-        
-        # Extract the final data from the agent's state
-        extracted_data = result.get("extracted_data", {})
-        suggested_followups = result.get("suggested_followups", [])
-        history_summary = result.get("history_summary", "")
-        suggested_resources = result.get("suggested_resources", [])
-        
-        # Construct a user-friendly response message
-        hcp_name = extracted_data.get("hcpName", "the HCP")
-        response_message = f"I've processed your interaction with {hcp_name}."
-        
-        if history_summary and history_summary != "No previous interaction history available for this HCP in the database." and history_summary != "No HCP name provided to summarize history.":
-            response_message += f" {history_summary}"
-        
-        if suggested_resources:
-            response_message += f" Based on your discussion, you might want to share: {', '.join(suggested_resources[:2])}."
-        
-        return InteractionResponse(
-            message=response_message,
-            extracted_data=extracted_data,
-            suggested_followups=suggested_followups
+        try:
+            while True:
+                try:
+                    # Enforce the same per-request time budget as the non-streaming endpoint
+                    chunk = await asyncio.wait_for(updates.__anext__(), timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                for node, update in chunk.items():
+                    if not update or node not in STREAM_EVENTS:
+                        continue
+                    for key, value in update.items():
+                        final_state[key] = agent.merge_dicts(final_state[key], value) if key == "extracted_data" else value
+                    event = STREAM_EVENTS[node]
+                    yield format_stream_frame(event, final_state[event], sse)
+            await remember_session(session_id, final_state)
+            yield format_stream_frame("final", build_response(final_state, session_id, draft_edit).dict(), sse)
+        except asyncio.TimeoutError:
+            await db.rollback()
+            yield format_stream_frame("error", {"detail": f"Interaction processing exceeded the {extraction_admission.timeout_seconds:g}s time budget."}, sse)
+        except Exception as e:
+            await db.rollback()
+            log_event("Full error processing streamed interaction", level="error", error=str(e))
+            yield format_stream_frame("error", {"detail": str(e)}, sse)
+        finally:
+            await updates.aclose()
+            await db.close()
+            await slot.__aexit__(None, None, None)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(frames(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+# Upper bound on items per HTTP batch request; larger backfills should use `python -m backend.ingest`
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+@app.post("/api/interactions/batch")
+async def process_interaction_batch(request: Request, start_index: int = Query(0, ge=0), concurrency: int = 8, chunk_size: int = 200):
+    """Bulk-ingest interaction notes given as NDJSON, a JSON list of texts, or {"texts": [...]}.
+    Results carry each item's index: a client resumes an interrupted batch with `start_index` and resubmits the
+    items listed in `stats.failed_indices`."""
+    body = (await request.body()).decode("utf-8")
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            texts = read_ndjson_texts(body.splitlines())
+        else:
+            payload = json.loads(body)
+            texts = payload.get("texts") if isinstance(payload, dict) else payload
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("Expected a JSON list of texts or an object with a 'texts' list")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items; use the ingest CLI for larger backfills.")
+
+    _, extraction = llm_stack()
+    return await ingest_texts(
+        texts,
+        # Batch items share the interactive endpoints' slots, so a large batch cannot starve them of LLM capacity;
+        # an item that is not admitted is reported as a per-item error (with its index) for the client to resubmit
+        lambda text: extraction_admission.run(extraction.extract_and_enrich(text)),
+        # In write-behind mode IDs come from the writer's counter so the two paths never collide
+        allocate_ids=interaction_writer.allocate_ids if interaction_writer is not None else None,
+        concurrency=max(1, min(concurrency, extraction_admission.max_concurrency)),
+        chunk_size=max(1, chunk_size),
+        start_index=start_index,
+        progress=lambda report: log_event("Batch ingest progress", next_index=report["next_index"], total=report["total"], items_per_second=report["items_per_second"]),
+    )
+
+@app.get("/api/interactions")
+async def get_interactions(
+    hcp: Optional[str] = None,
+    product: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    type: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = LISTING_DEFAULT_LIMIT,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List logged interactions, newest first, filtered by HCP, product, sentiment, type and date range.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page."""
+    try:
+        page_cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Names are stored in their catalog spelling, so resolve the filters the same way
+    catalog = await catalog_store.current()
+    hcp_record = catalog.resolve_hcp(hcp) if hcp else None
+    filters = InteractionFilters(
+        hcp_name=hcp_record.name if hcp_record else hcp,
+        product=(catalog.canonical_product(product) or product) if product else None,
+        sentiment=sentiment,
+        interaction_type=type,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return await list_interactions(db, filters, page_cursor, limit)
+
+@app.get("/api/interactions/export")
+async def export_all_interactions(format: str = "ndjson", gzip: bool = False, since: Optional[datetime] = None):
+    """Stream every interaction (or those updated after `since`) as NDJSON or CSV, optionally gzip-compressed.
+    The X-Export-Watermark header is the `since` to pass for the next incremental export."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if since is not None:
+        # updated_at is naive UTC, and comparing it with an offset-aware datetime raises
+        since = to_naive_utc(since)
+    # Fixed before the first byte is sent, so the header can carry it; rows newer than it go to the next export
+    watermark = await asyncio.to_thread(export_watermark, since)
+    next_since = watermark or since
+    filename = f"interactions.{format}{'.gz' if gzip else ''}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if next_since is not None:
+        headers["X-Export-Watermark"] = next_since.isoformat()
+    media_type = "application/gzip" if gzip else ("application/x-ndjson" if format == "ndjson" else "text/csv; charset=utf-8")
+    # A sync generator: Starlette iterates it in the threadpool, one yield_per batch at a time
+    return StreamingResponse(export_interactions(format, gzip, since, watermark), media_type=media_type, headers=headers)
+
+@app.get("/api/interactions/search")
+async def search_interaction_notes(
+    q: str,
+    hcp: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+    offset: int = 0,
+    raw: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search over topics discussed and follow-up actions, best match first, with highlighted snippets.
+    `raw=true` accepts FTS5 query syntax (phrases, OR, NEAR, prefix*)."""
+    catalog = await catalog_store.current()
+    hcp_record = catalog.resolve_hcp(hcp) if hcp else None
+    try:
+        return await search_interactions(
+            db, q,
+            hcp_name=hcp_record.name if hcp_record else hcp,
+            date_from=date_from,
+            date_to=date_to,
+            limit=limit,
+            offset=offset,
+            raw=raw,
         )
-    
-    except Exception as e:
-        db.rollback() # Ensure database rollback on error
-        print(f"Full error processing interaction: {e}")
-        raise HTTPException(status_code=500, detail=f"An internal error occurred while processing your request. Please try again or rephrase. Error: {str(e)}")
+    except SearchQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/analytics/trends")
+async def analytics_trends(
+    metric: str = "sentiment",
+    by: Optional[str] = None,
+    hcp: Optional[str] = None,
+    product: Optional[str] = None,
+    territory: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Weekly trends from the analytics rollups: interactions per sentiment (metric=sentiment) or product
+    mentions (metric=products), optionally broken down by=hcp|territory and filtered by HCP, product, territory and dates."""
+    catalog = await catalog_store.current()
+    hcp_record = catalog.resolve_hcp(hcp) if hcp else None
+    try:
+        return await rollups.trend_summary(
+            db, metric, by,
+            hcp_name=hcp_record.name if hcp_record else hcp,
+            product=(catalog.canonical_product(product) or product) if product else None,
+            territory=territory,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/write-behind/stats")
+async def write_behind_stats():
+    if interaction_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **interaction_writer.snapshot()}
+
+@app.get("/api/fast-path/stats")
+async def fast_path_stats_endpoint():
+    _, extraction = llm_stack()
+    return extraction.fast_path_stats.snapshot()
+
+@app.get("/api/extraction-cache/stats")
+async def extraction_cache_stats():
+    _, extraction = llm_stack()
+    if extraction.extraction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **extraction.extraction_cache.snapshot()}
+
+@app.get("/api/sessions/stats")
+async def session_store_stats():
+    return session_store.snapshot()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
@@ -399,7 +500,7 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    # IMPORTANT: Set your GROQ_API_KEY environment variable BEFORE running this.
+    # IMPORTANT: Set your GROQ_API_KEY environment variable BEFORE running this (or LLM_PROVIDER=fake to run offline).
     # For a quick temporary test (DO NOT USE IN PRODUCTION OR SHARE):
     # os.environ["GROQ_API_KEY"] = "sk_..." # Replace with your actual Groq API key
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,77 @@
+# backend/product_index.py
+# Normalized interaction <-> product index (the `interaction_products` table), one row per product discussed.
+# Kept in step with the interactions table through projections.py; rebuilt from scratch by the CLI.
+#
+# CLI usage:
+#   python -m backend.product_index rebuild   # recompute the index from interactions.products_discussed
+import argparse
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from .database import Interaction, InteractionProduct, SessionLocal
+
+REBUILD_CHUNK_SIZE = 5000
+
+
+def product_rows(interaction_id: int, products: Optional[List[str]], interaction_day) -> List[Dict[str, Any]]:
+    """Index rows for one interaction; duplicate and blank product names are dropped."""
+    names = dict.fromkeys(p.strip() for p in (products or []) if isinstance(p, str) and p.strip())
+    return [{"interaction_id": interaction_id, "product": name, "interaction_day": interaction_day} for name in names]
+
+
+def _rows_for(interactions: List[Interaction]) -> List[Dict[str, Any]]:
+    return [row for i in interactions for row in product_rows(i.id, i.products_discussed, i.interaction_day)]
+
+
+def apply_inserted(session: Session, interactions: List[Interaction]) -> None:
+    """Index newly inserted (already flushed, so IDs are assigned) interactions."""
+    rows = _rows_for(interactions)
+    if rows:
+        session.execute(insert(InteractionProduct), rows)
+
+
+def apply_updated(session: Session, interactions: List[Interaction]) -> None:
+    """Re-index edited interactions (products or date may have changed)."""
+    session.flush()
+    session.execute(delete(InteractionProduct).where(InteractionProduct.interaction_id.in_([i.id for i in interactions])))
+    apply_inserted(session, interactions)
+
+
+def rebuild_product_index(session: Session) -> int:
+    """Recompute the whole index in one streaming pass. Returns the number of index rows."""
+    session.execute(delete(InteractionProduct))
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    result = session.execute(
+        select(Interaction.id, Interaction.products_discussed, Interaction.interaction_day).execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    )
+    for interaction_id, products, interaction_day in result:
+        batch.extend(product_rows(interaction_id, products, interaction_day))
+        if len(batch) >= REBUILD_CHUNK_SIZE:
+            session.execute(insert(InteractionProduct), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(InteractionProduct), batch)
+        count += len(batch)
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the interaction <-> product index.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    from .database import create_db_and_tables
+    create_db_and_tables()
+
+    with SessionLocal() as db:
+        count = rebuild_product_index(db)
+        db.commit()
+        print(f"[product_index] Rebuilt {count} index rows")
+
+
+if __name__ == "__main__":
+    main()
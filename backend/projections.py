@@ -0,0 +1,32 @@
+# backend/projections.py
+# Single hook for keeping derived tables in step with the `interactions` table.
+# Every code path that inserts or edits interactions calls these inside the same transaction, after flushing
+# the interaction rows, so derived data commits (or rolls back) atomically with the source rows.
+# They take a sync Session; async callers use `await db.run_sync(record_inserted, interactions)`.
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session
+
+from . import history, product_index, rollups
+from .database import Interaction
+
+
+def record_inserted(session: Session, interactions: List[Interaction]) -> None:
+    """Update derived tables for newly inserted (flushed) interactions."""
+    history.apply_inserted(session, interactions)
+    product_index.apply_inserted(session, interactions)
+    rollups.apply_inserted(session, interactions)
+
+
+def record_updated(session: Session, interactions: List[Interaction], previous: Dict[int, Dict[str, Any]]) -> None:
+    """Update derived tables for edited interactions. `previous` maps interaction ID to its column values before the edit."""
+    history.apply_updated(session, interactions, [values.get("hcp_name") for values in previous.values()])
+    product_index.apply_updated(session, interactions)
+    rollups.apply_updated(session, interactions, previous)
+
+
+def rebuild_all(session: Session) -> None:
+    """Recompute every derived table from the interactions table (after bulk loads that bypass the hooks)."""
+    history.rebuild_history(session)
+    product_index.rebuild_product_index(session)
+    rollups.rebuild_rollups(session) # Reads the product index, so it goes last
@@ -0,0 +1,282 @@
+# backend/rollups.py
+# Weekly analytics rollups: interactions per (week, HCP, sentiment) in sentiment_rollups, and product mentions
+# per (week, territory, product, sentiment) in product_mention_rollups.
+# Inserts add +1 to their keys and edits move counts from the old keys to the new ones (through projections.py),
+# so trend queries read pre-aggregated rows instead of decoding products_discussed on every interaction.
+# Interactions without a parseable date have no week and are left out.
+#
+# CLI usage:
+#   python -m backend.rollups rebuild   # recompute both rollup tables from the interactions table
+#   python -m backend.rollups check     # report rollup counts that disagree with the interactions table
+import argparse
+import json
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .database import Hcp, Interaction, InteractionProduct, ProductMentionRollup, SentimentRollup, SessionLocal
+from .product_index import product_rows
+
+TREND_METRICS = ("sentiment", "products")
+TREND_GROUPINGS = {"sentiment": ("hcp", "territory"), "products": ("territory",)}
+
+SentimentKey = Tuple[date, str, str] # (week_start, hcp_name, sentiment)
+ProductKey = Tuple[date, str, str, str] # (week_start, territory, product, sentiment)
+
+
+def week_start(day: date) -> date:
+    """Monday of the ISO week containing `day`."""
+    return day - timedelta(days=day.weekday())
+
+
+def _week_start_sql(day_column):
+    # Step back six days, then forward to the next Monday: the Monday on or before the day
+    return func.date(day_column, "-6 days", "weekday 1")
+
+
+def rollup_keys(values: Dict[str, Any], territories: Dict[str, Optional[str]]) -> Tuple[List[SentimentKey], List[ProductKey]]:
+    """Keys one interaction counts towards, from its column values (see Interaction.column_values)."""
+    day = values.get("interaction_day")
+    if day is None:
+        return [], []
+    week, hcp_name, sentiment = week_start(day), values.get("hcp_name") or "", values.get("hcp_sentiment") or ""
+    territory = territories.get(hcp_name) or ""
+    products = [row["product"] for row in product_rows(0, values.get("products_discussed"), day)]
+    return [(week, hcp_name, sentiment)], [(week, territory, product, sentiment) for product in products]
+
+
+def _column_values(interaction: Interaction) -> Dict[str, Any]:
+    return {
+        "interaction_day": interaction.interaction_day,
+        "hcp_name": interaction.hcp_name,
+        "hcp_sentiment": interaction.hcp_sentiment,
+        "products_discussed": interaction.products_discussed,
+    }
+
+
+def _territories(session: Session, hcp_names: Iterable[Optional[str]]) -> Dict[str, Optional[str]]:
+    names = {name for name in hcp_names if name}
+    if not names:
+        return {}
+    return dict(session.execute(select(Hcp.name, Hcp.territory).where(Hcp.name.in_(names))).all())
+
+
+def _collect(values: List[Dict[str, Any]], sign: int, territories, sentiment_deltas: Counter, product_deltas: Counter) -> None:
+    for item in values:
+        sentiment_keys, product_keys = rollup_keys(item, territories)
+        for key in sentiment_keys:
+            sentiment_deltas[key] += sign
+        for key in product_keys:
+            product_deltas[key] += sign
+
+
+def _apply_deltas(session: Session, sentiment_deltas: Counter, product_deltas: Counter) -> None:
+    """Add signed deltas to the rollup counts in SQL (so concurrent writers cannot lose updates), creating rows
+    as needed and dropping rows that reach zero."""
+    sentiment_rows = [
+        {"week_start": week, "hcp_name": hcp_name, "sentiment": sentiment, "interaction_count": delta}
+        for (week, hcp_name, sentiment), delta in sentiment_deltas.items() if delta
+    ]
+    if sentiment_rows:
+        statement = sqlite_insert(SentimentRollup)
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["week_start", "hcp_name", "sentiment"],
+                set_={"interaction_count": SentimentRollup.interaction_count + statement.excluded.interaction_count},
+            ),
+            sentiment_rows,
+        )
+    mention_rows = [
+        {"week_start": week, "territory": territory, "product": product, "sentiment": sentiment, "mention_count": delta}
+        for (week, territory, product, sentiment), delta in product_deltas.items() if delta
+    ]
+    if mention_rows:
+        statement = sqlite_insert(ProductMentionRollup)
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["week_start", "territory", "product", "sentiment"],
+                set_={"mention_count": ProductMentionRollup.mention_count + statement.excluded.mention_count},
+            ),
+            mention_rows,
+        )
+
+    # Only edits decrement; clear emptied rows within the touched weeks (a primary-key prefix range)
+    weeks = {key[0] for key, delta in sentiment_deltas.items() if delta < 0}
+    if weeks:
+        session.execute(delete(SentimentRollup).where(SentimentRollup.week_start.in_(weeks), SentimentRollup.interaction_count <= 0))
+    weeks = {key[0] for key, delta in product_deltas.items() if delta < 0}
+    if weeks:
+        session.execute(delete(ProductMentionRollup).where(ProductMentionRollup.week_start.in_(weeks), ProductMentionRollup.mention_count <= 0))
+
+
+def apply_inserted(session: Session, interactions: List[Interaction]) -> None:
+    """Count newly inserted (flushed) interactions."""
+    values = [_column_values(i) for i in interactions]
+    territories = _territories(session, (item["hcp_name"] for item in values))
+    sentiment_deltas, product_deltas = Counter(), Counter()
+    _collect(values, +1, territories, sentiment_deltas, product_deltas)
+    _apply_deltas(session, sentiment_deltas, product_deltas)
+
+
+def apply_updated(session: Session, interactions: List[Interaction], previous: Dict[int, Dict[str, Any]]) -> None:
+    """Move edited interactions from the keys of their `previous` column values to their current ones."""
+    old_values = [previous[i.id] for i in interactions if i.id in previous]
+    new_values = [_column_values(i) for i in interactions]
+    territories = _territories(session, (item.get("hcp_name") for item in old_values + new_values))
+    sentiment_deltas, product_deltas = Counter(), Counter()
+    _collect(old_values, -1, territories, sentiment_deltas, product_deltas)
+    _collect(new_values, +1, territories, sentiment_deltas, product_deltas)
+    _apply_deltas(session, sentiment_deltas, product_deltas)
+
+
+def _sentiment_counts_query():
+    week = _week_start_sql(Interaction.interaction_day)
+    hcp_name, sentiment = func.coalesce(Interaction.hcp_name, ""), func.coalesce(Interaction.hcp_sentiment, "")
+    return (
+        select(week, hcp_name, sentiment, func.count())
+        .where(Interaction.interaction_day.is_not(None))
+        .group_by(week, hcp_name, sentiment)
+    )
+
+
+def _product_counts_query():
+    # Grouped from the normalized product index, which already holds one row per distinct product per interaction
+    week = _week_start_sql(InteractionProduct.interaction_day)
+    territory, sentiment = func.coalesce(Hcp.territory, ""), func.coalesce(Interaction.hcp_sentiment, "")
+    return (
+        select(week, territory, InteractionProduct.product, sentiment, func.count())
+        .join(Interaction, Interaction.id == InteractionProduct.interaction_id)
+        .outerjoin(Hcp, Hcp.name == Interaction.hcp_name)
+        .where(InteractionProduct.interaction_day.is_not(None))
+        .group_by(week, territory, InteractionProduct.product, sentiment)
+    )
+
+
+def rebuild_product_mentions(session: Session) -> int:
+    """Recompute product_mention_rollups (also after HCP territory changes). Returns its row count."""
+    session.execute(delete(ProductMentionRollup))
+    session.execute(insert(ProductMentionRollup).from_select(["week_start", "territory", "product", "sentiment", "mention_count"], _product_counts_query()))
+    return session.scalar(select(func.count()).select_from(ProductMentionRollup))
+
+
+def rebuild_rollups(session: Session) -> Dict[str, int]:
+    """Recompute both tables with INSERT ... SELECT ... GROUP BY. Needs an up-to-date product index
+    (projections.rebuild_all rebuilds it first). Returns the row count of each table."""
+    session.execute(delete(SentimentRollup))
+    session.execute(insert(SentimentRollup).from_select(["week_start", "hcp_name", "sentiment", "interaction_count"], _sentiment_counts_query()))
+    return {
+        "sentiment_rollups": session.scalar(select(func.count()).select_from(SentimentRollup)),
+        "product_mention_rollups": rebuild_product_mentions(session),
+    }
+
+
+def check_rollups(session: Session) -> Dict[str, Any]:
+    """Compare the stored counts with counts grouped from the raw tables."""
+    report: Dict[str, Any] = {"consistent": True}
+    for model, count_column, query in (
+        (SentimentRollup, SentimentRollup.interaction_count, _sentiment_counts_query()),
+        (ProductMentionRollup, ProductMentionRollup.mention_count, _product_counts_query()),
+    ):
+        key_columns = list(model.__table__.primary_key.columns)
+        stored = {tuple(str(v) for v in row[:-1]): row[-1] for row in session.execute(select(*key_columns, count_column))}
+        fresh = {tuple(str(v) for v in row[:-1]): row[-1] for row in session.execute(query)}
+        mismatched = sorted(key for key in stored.keys() | fresh.keys() if stored.get(key) != fresh.get(key))
+        report[model.__tablename__] = {
+            "rows": len(fresh),
+            "mismatched": [{"key": list(key), "stored": stored.get(key), "expected": fresh.get(key)} for key in mismatched[:20]],
+        }
+        report["consistent"] = report["consistent"] and not mismatched
+    return report
+
+
+async def trend_summary(
+    db: AsyncSession,
+    metric: str = "sentiment",
+    by: Optional[str] = None,
+    hcp_name: Optional[str] = None,
+    product: Optional[str] = None,
+    territory: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Dict[str, Any]:
+    """Weekly series from the rollups. metric="sentiment" counts interactions per sentiment (by HCP or territory,
+    filterable by HCP); metric="products" counts mentions per product (by territory, filterable by product).
+    Raises ValueError for options the metric does not support."""
+    if metric not in TREND_METRICS:
+        raise ValueError(f"metric must be one of {', '.join(TREND_METRICS)}")
+    if by is not None and by not in TREND_GROUPINGS[metric]:
+        raise ValueError(f"by must be one of {', '.join(TREND_GROUPINGS[metric])} for metric={metric}")
+    if product and metric != "products":
+        raise ValueError("product filters apply to metric=products")
+    if hcp_name and metric != "sentiment":
+        raise ValueError("hcp filters apply to metric=sentiment")
+
+    if metric == "sentiment":
+        model, count, dimension = SentimentRollup, func.sum(SentimentRollup.interaction_count), SentimentRollup.sentiment
+        # Territory comes from the catalog at query time
+        territory_column = func.coalesce(Hcp.territory, "")
+    else:
+        model, count, dimension = ProductMentionRollup, func.sum(ProductMentionRollup.mention_count), ProductMentionRollup.product
+        territory_column = ProductMentionRollup.territory
+
+    group_columns = [model.week_start]
+    if by == "hcp":
+        group_columns.append(model.hcp_name)
+    elif by == "territory":
+        group_columns.append(territory_column)
+    group_columns.append(dimension)
+
+    query = select(*group_columns, count)
+    if metric == "sentiment" and (by == "territory" or territory):
+        query = query.outerjoin(Hcp, Hcp.name == model.hcp_name)
+    if territory:
+        query = query.where(territory_column == territory)
+    if hcp_name:
+        query = query.where(model.hcp_name == hcp_name)
+    if product:
+        query = query.where(model.product == product)
+    if date_from:
+        query = query.where(model.week_start >= week_start(date_from))
+    if date_to:
+        query = query.where(model.week_start <= date_to)
+    query = query.group_by(*group_columns).order_by(*group_columns)
+
+    value_key, dimension_key = ("interactions", "sentiment") if metric == "sentiment" else ("mentions", "product")
+    series = []
+    for row in (await db.execute(query)).all():
+        item: Dict[str, Any] = {"week": row[0].isoformat()}
+        if by is not None:
+            item["hcpName" if by == "hcp" else "territory"] = row[1] or None
+        item[dimension_key] = row[-2] or None
+        item[value_key] = row[-1]
+        series.append(item)
+    return {"metric": metric, "period": "week", "by": by, "series": series}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the weekly analytics rollup tables.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args(argv)
+
+    from .database import create_db_and_tables
+    create_db_and_tables()
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            counts = rebuild_rollups(db)
+            db.commit()
+            print(f"[rollups] Rebuilt {counts['sentiment_rollups']} sentiment and {counts['product_mention_rollups']} product mention rows")
+        else:
+            report = check_rollups(db)
+            print(json.dumps(report, indent=2))
+            if not report["consistent"]:
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# backend/search.py
+# Full-text search over interaction notes (topics_discussed, follow_up_actions) with SQLite FTS5.
+# The index (`interactions_fts`) and the triggers that maintain it are created by database.create_db_and_tables.
+# Results are ranked with bm25 (topics weighted above follow-up actions) and carry highlighted snippets.
+#
+# CLI usage:
+#   python -m backend.search rebuild          # re-index every interaction (after restoring a DB or bulk loads)
+#   python -m backend.search optimize         # merge index segments into one (after large backfills)
+#   python -m backend.search check            # verify the index against the interactions table
+#   python -m backend.search query "renal dosing"
+import argparse
+import asyncio
+import json
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import FTS_TABLE, SessionLocal
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# bm25 column weights, in FTS column order (topics_discussed, follow_up_actions)
+BM25_WEIGHTS = (2.0, 1.0)
+SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS = "<mark>", "</mark>", "…"
+SNIPPET_TOKENS = 12
+
+_TERM_RE = re.compile(r"[\w]+\*?", re.UNICODE)
+
+
+class SearchQueryError(ValueError):
+    """The search text cannot be turned into an FTS5 query."""
+
+
+def build_match_query(query: str) -> str:
+    """Plain user text to an FTS5 MATCH expression: every word must occur (any order); a trailing * keeps
+    prefix matching ("dos*"). Words are quoted, so FTS5 operators and punctuation in the input are inert."""
+    terms = []
+    for term in _TERM_RE.findall(query):
+        prefix = term.endswith("*")
+        word = term.rstrip("*")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    if not terms:
+        raise SearchQueryError("Search text must contain at least one word")
+    return " ".join(terms)
+
+
+async def search_interactions(
+    db: AsyncSession,
+    query: str,
+    hcp_name: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+    offset: int = 0,
+    raw: bool = False,
+) -> Dict[str, Any]:
+    """One page of matching interactions, best match first. `raw=True` passes `query` to FTS5 unchanged
+    (phrase, NEAR, OR and column filters); invalid syntax raises SearchQueryError."""
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    offset = max(0, offset)
+    params: Dict[str, Any] = {"match": query if raw else build_match_query(query), "limit": limit + 1, "offset": offset}
+    filters = ""
+    if hcp_name:
+        filters += " AND i.hcp_name = :hcp_name"
+        params["hcp_name"] = hcp_name
+    if date_from:
+        filters += " AND i.interaction_day >= :date_from"
+        params["date_from"] = date_from.isoformat()
+    if date_to:
+        filters += " AND i.interaction_day <= :date_to"
+        params["date_to"] = date_to.isoformat()
+
+    snippet = f"'{SNIPPET_START}', '{SNIPPET_END}', '{SNIPPET_ELLIPSIS}', {SNIPPET_TOKENS}"
+    statement = text(
+        f"SELECT i.id, i.hcp_name, i.interaction_type, i.interaction_date, i.hcp_sentiment, "
+        f"bm25({FTS_TABLE}, {BM25_WEIGHTS[0]}, {BM25_WEIGHTS[1]}) AS score, "
+        f"snippet({FTS_TABLE}, 0, {snippet}) AS topics_snippet, "
+        f"snippet({FTS_TABLE}, 1, {snippet}) AS follow_up_snippet "
+        f"FROM {FTS_TABLE} JOIN interactions AS i ON i.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match{filters} "
+        f"ORDER BY score, i.id LIMIT :limit OFFSET :offset"
+    )
+    try:
+        rows = (await db.execute(statement, params)).all()
+    except OperationalError as e:
+        if "no such table" in str(e):
+            raise # FTS5 unavailable in this SQLite build
+        raise SearchQueryError(f"Invalid search query: {e.orig}")
+
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "hcpName": row.hcp_name,
+                "interactionType": row.interaction_type,
+                "date": row.interaction_date,
+                "hcpSentiment": row.hcp_sentiment,
+                "score": round(-row.score, 4), # bm25() is lower-is-better; report higher-is-better
+                "snippets": {"topicsDiscussed": row.topics_snippet, "followUpActions": row.follow_up_snippet},
+            }
+            for row in rows[:limit]
+        ],
+        "next_offset": offset + limit if len(rows) > limit else None,
+    }
+
+
+def run_maintenance(command: str) -> None:
+    """'rebuild' re-reads every row from interactions; 'optimize' merges all index b-trees into one;
+    'check' raises if the index disagrees with the interactions table."""
+    statements = {
+        "rebuild": f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+        "optimize": f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')",
+        "check": f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)",
+    }
+    with SessionLocal() as db:
+        db.execute(text(statements[command]))
+        db.commit()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain and query the interaction full-text index.")
+    parser.add_argument("command", choices=["rebuild", "optimize", "check", "query"])
+    parser.add_argument("text", nargs="?", help="Search text for the query command")
+    parser.add_argument("--limit", type=int, default=SEARCH_DEFAULT_LIMIT)
+    args = parser.parse_args(argv)
+
+    from .database import AsyncSessionLocal, create_db_and_tables
+    create_db_and_tables()
+
+    if args.command == "query":
+        if not args.text:
+            parser.error("query needs search text")
+
+        async def run_query():
+            async with AsyncSessionLocal() as db:
+                return await search_interactions(db, args.text, limit=args.limit)
+
+        print(json.dumps(asyncio.run(run_query()), indent=2, ensure_ascii=False))
+        return
+
+    try:
+        run_maintenance(args.command)
+    except OperationalError as e:
+        print(f"[search] {args.command} failed: {e.orig}")
+        raise SystemExit(1)
+    print(f"[search] {args.command} done")
+
+
+if __name__ == "__main__":
+    main()
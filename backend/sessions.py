@@ -0,0 +1,200 @@
+# backend/sessions.py
+# Server-side interaction sessions, so follow-up edits ("change sentiment to positive") patch the interaction
+# already logged instead of re-running LLM extraction and inserting a duplicate row.
+# A session maps a session ID to the current draft: the logged interaction's ID and its extracted fields.
+# Drafts live in a bounded in-memory LRU with TTL, optionally backed by a SQLite file (shared across workers and
+# restarts). Edits are parsed with the deterministic fast-path rules, plus an explicit context["patch"].
+import asyncio
+import os
+import re
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from .catalog import CatalogIndex
+from .fast_path import extract_date, extract_hcp_name, extract_interaction_type, extract_sentiment, extract_time
+from .kvstore import LRUCache, SqliteTTLStore
+
+# Fields an edit may set, in the API's camelCase (see Interaction.to_dict), and the column each one is stored in.
+# interaction_day follows interaction_date through Interaction's validator.
+EDITABLE_FIELDS = {
+    "hcpName": "hcp_name",
+    "interactionType": "interaction_type",
+    "date": "interaction_date",
+    "time": "interaction_time",
+    "productsDiscussed": "products_discussed",
+    "topicsDiscussed": "topics_discussed",
+    "materialsShared": "materials_shared",
+    "hcpSentiment": "hcp_sentiment",
+    "followUpActions": "follow_up_actions",
+}
+
+# The interaction type is only changed when the edit talks about it ("it was a call", "change the type to email"),
+# since words like "call" also appear in edits about other fields
+_TYPE_EDIT_RE = re.compile(r"\b(type|it was an?|make it an?)\b", re.IGNORECASE)
+_REMOVE_PRODUCT_RE = re.compile(r"\b(remove|drop|delete|didn't discuss|did not discuss|not discussed)\b", re.IGNORECASE)
+_ADD_PRODUCT_RE = re.compile(r"\b(add|also|as well)\b", re.IGNORECASE)
+# Clause boundaries for product edits: "remove CardioPlus, add NeuroCalm" or "drop CardioPlus but keep NeuroCalm"
+_CLAUSE_SPLIT_RE = re.compile(r"[,;.]|\b(?:and|but)\b", re.IGNORECASE)
+
+
+def _product_actions(text: str, catalog: CatalogIndex) -> Dict[str, Optional[str]]:
+    """Each product named in an edit, mapped to "remove", "add" or None (no add/remove wording: replace the list).
+    A product takes the verb before it in its clause ("remove CardioPlus"), else the first one after it ("CardioPlus
+    was not discussed"). Clauses without a verb continue the previous clause ("remove CardioPlus and NeuroCalm") or,
+    at the start of the edit, lead into the next one ("CardioPlus and NeuroCalm were not discussed")."""
+    actions: Dict[str, Optional[str]] = {}
+    leading: List[str] = [] # Products in verbless clauses before the first verb
+    last_action: Optional[str] = None
+    for clause in _CLAUSE_SPLIT_RE.split(text):
+        verbs = sorted(
+            [(m.start(), "remove") for m in _REMOVE_PRODUCT_RE.finditer(clause)]
+            + [(m.start(), "add") for m in _ADD_PRODUCT_RE.finditer(clause)]
+        )
+        if not verbs:
+            products = catalog.find_products(clause)
+            if last_action is None:
+                leading.extend(products)
+            for product in products:
+                actions[product] = last_action
+            continue
+        if last_action is None:
+            for product in leading:
+                actions[product] = verbs[0][1]
+        bounds = [0] + [start for start, _ in verbs] + [len(clause)]
+        for start, end, action in zip(bounds, bounds[1:], [verbs[0][1]] + [action for _, action in verbs]):
+            for product in catalog.find_products(clause[start:end]):
+                actions[product] = action
+        last_action = verbs[-1][1]
+    return actions
+
+
+def parse_edit(text: str, draft: Dict[str, Any], catalog: CatalogIndex, today: Optional[date] = None) -> Dict[str, Any]:
+    """Field changes stated in a follow-up edit, e.g. "change sentiment to positive" or "it was on April 21".
+    Only fields the rules recognize are returned; free-text fields are edited through context["patch"].
+    Callers pass the result (merged with the patch) through normalize_edit."""
+    today = today or date.today()
+    changes: Dict[str, Any] = {}
+    for name, value in (
+        ("hcpSentiment", extract_sentiment(text)),
+        ("date", extract_date(text, today)),
+        ("time", extract_time(text)),
+        ("hcpName", extract_hcp_name(text, catalog)),
+        ("interactionType", extract_interaction_type(text) if _TYPE_EDIT_RE.search(text) else None),
+    ):
+        if value is not None:
+            changes[name] = value
+
+    actions = _product_actions(text, catalog)
+    if actions:
+        added = [product for product, action in actions.items() if action != "remove"]
+        if any(actions.values()):
+            current = [catalog.canonical_product(p) or p for p in draft.get("productsDiscussed") or []]
+            kept = [p for p in current if actions.get(p, "add") != "remove"]
+            changes["productsDiscussed"] = list(dict.fromkeys([*kept, *added]))
+        else:
+            changes["productsDiscussed"] = added
+    return changes
+
+
+def normalize_edit(changes: Dict[str, Any], draft: Dict[str, Any], catalog: CatalogIndex) -> Dict[str, Any]:
+    """Store edited HCP and product names in their catalog spelling, as logging does (see apply_default_materials),
+    and re-derive default materials when the products change, unless the edit sets materials itself or the stored
+    ones are not the defaults of the old products."""
+    changes = dict(changes)
+    hcp = catalog.resolve_hcp(changes.get("hcpName"))
+    if hcp is not None:
+        changes["hcpName"] = hcp.name
+    if changes.get("productsDiscussed"):
+        changes["productsDiscussed"] = list(dict.fromkeys(catalog.canonical_product(p) or p for p in changes["productsDiscussed"]))
+    if "productsDiscussed" in changes and "materialsShared" not in changes:
+        materials = draft.get("materialsShared")
+        if not materials or materials == catalog.default_materials(draft.get("productsDiscussed") or []):
+            defaults = catalog.default_materials(changes["productsDiscussed"] or [])
+            if defaults or materials:
+                changes["materialsShared"] = defaults or None
+    return changes
+
+
+class InteractionNotFound(LookupError):
+    """The interaction an edit refers to does not exist (any more)."""
+
+
+def _is_string_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _is_material_list(value: Any) -> bool:
+    return isinstance(value, list) and all(
+        isinstance(item, dict) and all(isinstance(v, str) for v in item.values()) for item in value
+    )
+
+
+# Value checks for patched fields, mirroring ExtractedInteractionData; every other editable field is a string.
+# None clears a field.
+_PATCH_VALUE_CHECKS = {
+    "productsDiscussed": (_is_string_list, "a list of strings"),
+    "materialsShared": (_is_material_list, "a list of objects with string values"),
+}
+
+
+def explicit_patch(patch: Any) -> Dict[str, Any]:
+    """The editable fields of a client-supplied patch (e.g. the form's changed fields); other keys are ignored.
+    Raises ValueError when the patch is not an object or a field has the wrong type."""
+    if patch is None:
+        return {}
+    if not isinstance(patch, dict):
+        raise ValueError("patch must be an object of field values")
+    changes = {name: value for name, value in patch.items() if name in EDITABLE_FIELDS}
+    for name, value in changes.items():
+        check, expected = _PATCH_VALUE_CHECKS.get(name, (lambda v: isinstance(v, str), "a string"))
+        if value is not None and not check(value):
+            raise ValueError(f"patch.{name} must be {expected} or null")
+    return changes
+
+
+class InteractionSessionStore:
+    """Two-tier (LRU + optional SQLite) store of session drafts: {"interaction_id": int, "extracted_data": {...}}."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 8 * 3600, sqlite_path: Optional[str] = None, max_persistent_rows: int = 100_000):
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.persistent = SqliteTTLStore(sqlite_path, "interaction_sessions", ttl_seconds, max_persistent_rows) if sqlite_path else None
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "saves": 0}
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        draft = self.memory.get(session_id)
+        if draft is not None:
+            self.stats["memory_hits"] += 1
+            return draft
+        if self.persistent is not None:
+            draft = await asyncio.to_thread(self.persistent.get, session_id)
+            if draft is not None:
+                self.stats["persistent_hits"] += 1
+                self.memory.set(session_id, draft)
+                return draft
+        self.stats["misses"] += 1
+        return None
+
+    async def save(self, session_id: str, interaction_id: Optional[int], extracted_data: Dict[str, Any]) -> None:
+        draft = {"interaction_id": interaction_id, "extracted_data": dict(extracted_data)}
+        self.memory.set(session_id, draft)
+        if self.persistent is not None:
+            await asyncio.to_thread(self.persistent.set, session_id, draft)
+        self.stats["saves"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "memory_entries": len(self.memory), "persistent": self.persistent is not None}
+
+
+def session_store_from_env() -> InteractionSessionStore:
+    """Build the store from environment variables; SESSION_STORE_SQLITE_PATH enables the persistent tier."""
+    return InteractionSessionStore(
+        max_entries=int(os.getenv("SESSION_STORE_MAX_ENTRIES", "1024")),
+        ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", str(8 * 3600))),
+        sqlite_path=os.getenv("SESSION_STORE_SQLITE_PATH") or None,
+        max_persistent_rows=int(os.getenv("SESSION_STORE_MAX_ROWS", "100000")),
+    )
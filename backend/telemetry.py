@@ -0,0 +1,270 @@
+# backend/telemetry.py
+# Metrics, per-request trace IDs and structured logs, with no dependencies beyond the standard library.
+# Metrics are rendered in the Prometheus text format by GET /metrics. Every log line made through `log_event`
+# carries the current request's trace ID (the X-Request-ID header, or a generated one, echoed in the response).
+#
+# Log format: LOG_FORMAT=json for one JSON object per line, otherwise "message key=value ...".
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Latency buckets in seconds, from sub-millisecond SQL statements up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        # SQL timings are recorded from worker threads, so every update takes the lock
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """A value set directly, or read from `callback` (returning {label values: value}) at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            values.update(self.callback())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last slot is +Inf), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        slot = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip([*self.buckets, float("inf")], counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics.values() for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram("http_request_duration_seconds", "HTTP request latency, until the last response byte.", ["method", "route", "status"])
+GRAPH_NODE_DURATION = registry.histogram("graph_node_duration_seconds", "Wall time per LangGraph node.", ["node"])
+GRAPH_NODE_ERRORS = registry.counter("graph_node_errors_total", "LangGraph node executions that raised.", ["node"])
+LLM_REQUEST_DURATION = registry.histogram("llm_request_duration_seconds", "LLM extraction call latency.", ["provider", "model"])
+LLM_REQUESTS = registry.counter("llm_requests_total", "LLM extraction calls by outcome.", ["provider", "outcome"])
+LLM_TOKENS = registry.counter("llm_tokens_total", "LLM tokens used, by kind (prompt/completion).", ["provider", "kind"])
+SQL_STATEMENT_DURATION = registry.histogram("sql_statement_duration_seconds", "SQL statement execution time.", ["engine", "operation"])
+ADMISSION_REJECTED = registry.counter("admission_rejected_total", "Requests rejected by admission control.", ["status"])
+
+
+# --- Trace IDs and structured logs ---
+trace_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+
+def new_trace_id(incoming: Optional[str] = None) -> str:
+    """Use the caller's X-Request-ID when it is sane, otherwise generate one."""
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid.uuid4().hex
+
+
+def log_event(message: str, level: str = "info", **fields) -> None:
+    trace_id = trace_id_var.get()
+    if LOG_FORMAT == "json":
+        record = {"ts": datetime.now(timezone.utc).isoformat(), "level": level, "message": message, **fields}
+        if trace_id:
+            record["trace_id"] = trace_id
+        print(json.dumps(record, default=str), flush=True)
+        return
+    extras = {**fields, **({"trace_id": trace_id} if trace_id else {})}
+    suffix = " ".join(f"{key}={value}" for key, value in extras.items())
+    print(f"{message} {suffix}" if suffix else message, flush=True)
+
+
+class RequestTelemetryMiddleware:
+    """Tag each HTTP request with a trace ID (echoed as X-Request-ID and added to every log line) and time it.
+    Plain ASGI rather than @app.middleware("http"), which adds a task and a body re-stream per request and
+    would time streaming responses only until their headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"x-request-id"), None)
+        trace_id = new_trace_id(incoming)
+        token = trace_id_var.set(trace_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_trace_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", trace_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            # The router stores the matched route in the scope; route templates keep label cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
+            trace_id_var.reset(token)
+
+
+# --- SQL statement timing ---
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+def instrument_engine(engine, label: str) -> None:
+    """Time every statement on a sync Engine (for an AsyncEngine pass `async_engine.sync_engine`)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip()[:6].upper()
+        if operation not in _SQL_OPERATIONS:
+            operation = "OTHER"
+        SQL_STATEMENT_DURATION.observe(time.perf_counter() - started, engine=label, operation=operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # The statement failed, so after_cursor_execute will not pop its start time
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
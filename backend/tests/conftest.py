@@ -0,0 +1,8 @@
+# backend/tests/conftest.py
+# Run with `python -m pytest backend/tests` from the repository root.
+# Point the backend at a throwaway database before any backend module creates its engines.
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="pharma-tests-"), "test.db")
+os.environ.setdefault("LLM_PROVIDER", "fake")
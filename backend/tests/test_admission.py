@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from backend.admission import AdmissionController, AdmissionRejected
+
+
+def make_controller(**overrides) -> AdmissionController:
+    settings = {"max_concurrency": 1, "max_queue": 1, "timeout_seconds": 1.0, "queue_wait_seconds": 1.0, **overrides}
+    return AdmissionController(**settings)
+
+
+async def hold(controller: AdmissionController, release: asyncio.Event):
+    async with controller.slot():
+        await release.wait()
+
+
+def test_runs_within_the_concurrency_limit():
+    controller = make_controller(max_concurrency=2, max_queue=10)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        peak = max(peak, controller.in_flight)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def run():
+        return await asyncio.gather(*(controller.run(work()) for _ in range(6)))
+
+    assert asyncio.run(run()) == ["done"] * 6
+    assert peak == 2
+    assert controller.in_flight == 0 and controller.waiting == 0
+
+
+def test_full_queue_is_rejected_with_429_and_retry_after():
+    controller = make_controller()
+
+    async def run():
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.run(asyncio.sleep(0))
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert rejected.status_code == 429
+    assert int(rejected.headers()["Retry-After"]) >= 1
+
+
+def test_queue_wait_timeout_is_rejected_with_503():
+    controller = make_controller(queue_wait_seconds=0.05)
+
+    async def run():
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.run(asyncio.sleep(0))
+        release.set()
+        await holder
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert rejected.status_code == 503 and "waiting" in rejected.detail
+    assert controller.waiting == 0
+
+
+def test_time_budget_is_rejected_with_503_and_frees_the_slot():
+    controller = make_controller(timeout_seconds=0.05)
+
+    async def run():
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.run(asyncio.sleep(1))
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert rejected.status_code == 503 and "time budget" in rejected.detail
+    assert controller.in_flight == 0
+    assert asyncio.run(controller.run(asyncio.sleep(0, result="ok"))) == "ok"
+
+
+def test_rejected_coroutines_are_closed():
+    controller = make_controller(max_queue=0)
+
+    async def work():
+        return "never"
+
+    async def run():
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        pending = work()
+        with pytest.raises(AdmissionRejected):
+            await controller.run(pending)
+        release.set()
+        await holder
+        return pending
+
+    pending = asyncio.run(run())
+    assert pending.cr_frame is None  # closed, so no "never awaited" warning
@@ -0,0 +1,35 @@
+import asyncio
+
+from sqlalchemy import select
+
+from backend.agent import edit_interaction_tool
+from backend.database import AsyncSessionLocal, Interaction, SentimentRollup, SessionLocal, async_engine, create_db_and_tables
+from backend.ingest import bulk_insert_interactions
+from backend.rollups import check_rollups
+
+HCP = "Dr. Concurrent Edit"
+
+
+def test_concurrent_identical_edits_apply_once():
+    create_db_and_tables()
+    [interaction_id] = bulk_insert_interactions([
+        Interaction.column_values({"hcpName": HCP, "date": "2032-01-07", "hcpSentiment": "Negative"}),
+    ])
+    state = {"input": "sentiment was positive", "context": {"patch": {"hcpSentiment": "Positive"}}, "interaction_id": interaction_id}
+
+    async def edit():
+        async with AsyncSessionLocal() as db:
+            result = await edit_interaction_tool(state, {"configurable": {"db_session": db}})
+            return result["updated_fields"]
+
+    async def run():
+        try:
+            return await asyncio.gather(edit(), edit())
+        finally:
+            await async_engine.dispose()
+
+    assert sorted(asyncio.run(run())) == [[], ["hcpSentiment"]]
+    with SessionLocal() as db:
+        counts = dict(db.execute(select(SentimentRollup.sentiment, SentimentRollup.interaction_count).where(SentimentRollup.hcp_name == HCP)).all())
+        assert counts == {"Positive": 1}
+        assert check_rollups(db)["consistent"]
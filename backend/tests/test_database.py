@@ -0,0 +1,35 @@
+from sqlalchemy import text
+
+from sqlalchemy import select
+
+from backend.database import (
+    HcpHistory, Interaction, InteractionProduct, ProductMentionRollup, SentimentRollup, SessionLocal, create_db_and_tables, engine,
+)
+from backend.history import check_history_consistency
+from backend.ingest import bulk_insert_interactions
+from backend.rollups import check_rollups
+
+
+def drop_tables(*names):
+    with engine.begin() as conn:
+        for name in names:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+
+def test_new_derived_tables_are_built_from_existing_interactions():
+    create_db_and_tables()
+    bulk_insert_interactions([
+        Interaction.column_values({"hcpName": "Dr. Backfill", "date": "2024-05-01", "hcpSentiment": "Positive", "productsDiscussed": ["CardioPlus"]}),
+        Interaction.column_values({"hcpName": "Dr. Backfill", "date": "2024-05-08", "hcpSentiment": "Negative"}),
+    ])
+    # A database that predates the derived tables
+    drop_tables(HcpHistory.__tablename__, InteractionProduct.__tablename__, SentimentRollup.__tablename__, ProductMentionRollup.__tablename__)
+
+    create_db_and_tables()
+    with SessionLocal() as db:
+        assert db.get(HcpHistory, "Dr. Backfill") is not None
+        assert check_history_consistency(db)["consistent"]
+        indexed = set(db.scalars(select(InteractionProduct.product)))
+        assert "CardioPlus" in indexed
+        assert check_rollups(db)["consistent"]
+        assert db.scalar(select(SentimentRollup.interaction_count).where(SentimentRollup.hcp_name == "Dr. Backfill")) == 1
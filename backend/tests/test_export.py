@@ -0,0 +1,54 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend import export
+from backend.database import Interaction, create_db_and_tables
+from backend.ingest import bulk_insert_interactions
+
+HCP = "Dr. Export Test"
+
+
+def insert(updated_at: datetime) -> int:
+    row = {**Interaction.column_values({"hcpName": HCP, "date": "2024-05-01"}), "updated_at": updated_at}
+    return bulk_insert_interactions([row])[0]
+
+
+def exported_ids(since, watermark):
+    lines = b"".join(export.export_interactions("ndjson", False, since, watermark)).decode().splitlines()
+    return [record["id"] for record in map(json.loads, lines) if record["hcpName"] == HCP]
+
+
+def test_rows_committed_late_with_older_timestamps_reach_the_next_export(monkeypatch):
+    create_db_and_tables()
+    now = datetime.utcnow()
+    settled = insert(now - timedelta(minutes=5))
+    recent = insert(now)
+
+    monkeypatch.setattr(export, "EXPORT_WATERMARK_LAG_SECONDS", 60)
+    watermark = export.export_watermark()
+    assert watermark <= now - timedelta(seconds=59)
+    assert exported_ids(None, watermark) == [settled]
+
+    # A transaction that stamped updated_at before `recent` but committed after the first export
+    late = insert(now - timedelta(seconds=1))
+    monkeypatch.setattr(export, "EXPORT_WATERMARK_LAG_SECONDS", 0)
+    next_watermark = export.export_watermark(watermark)
+    assert sorted(exported_ids(watermark, next_watermark)) == sorted([late, recent])
+
+
+def test_nothing_settled_since_returns_no_watermark(monkeypatch):
+    create_db_and_tables()
+    monkeypatch.setattr(export, "EXPORT_WATERMARK_LAG_SECONDS", 3600)
+    assert export.export_watermark(datetime.utcnow() - timedelta(minutes=1)) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-05-01T12:00:00", datetime(2024, 5, 1, 12)),
+    ("2024-05-01T12:00:00Z", datetime(2024, 5, 1, 12)),
+    ("2024-05-01T14:00:00+02:00", datetime(2024, 5, 1, 12)),
+])
+def test_since_is_naive_utc(value, expected):
+    assert export.parse_since(value) == expected
+    assert export.to_naive_utc(expected.replace(tzinfo=timezone.utc)) == expected
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from backend import extraction
+from backend.database import create_db_and_tables
+from backend.fast_path import FastPathStats
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    create_db_and_tables()
+    monkeypatch.setattr(extraction, "extraction_cache", None)
+    monkeypatch.setattr(extraction, "fast_path_stats", FastPathStats())
+    calls = []
+    original = extraction.trimmed_extraction_chain
+    monkeypatch.setattr(extraction, "trimmed_extraction_chain", lambda fields: calls.append(list(fields)) or original(fields))
+    return calls
+
+
+def test_llm_is_skipped_only_when_free_text_fields_are_resolved_too(fresh_stats):
+    text = "Met Dr. Patel yesterday, very positive. Discussed CardioPlus dosing. Need to send samples."
+    data = asyncio.run(extraction.extract_interaction_data(text))
+    assert extraction.fast_path_stats.counts["llm_skipped"] == 1 and fresh_stats == []
+    assert data["topicsDiscussed"] == "CardioPlus dosing" and data["followUpActions"] == "Need to send samples."
+
+
+@pytest.mark.parametrize("text", [
+    "Met Dr. Patel yesterday about OncoBoost, very positive; asked about renal dosing and wants the trial reprint.",
+    "Called Dr. Patel yesterday about CardioPlus, concerned about hypotension; send him the safety profile.",
+])
+def test_missing_free_text_fields_are_asked_from_the_llm(fresh_stats, text):
+    data = asyncio.run(extraction.extract_interaction_data(text))
+    assert fresh_stats == [["topicsDiscussed", "followUpActions"]]
+    assert extraction.fast_path_stats.counts["llm_trimmed"] == 1
+    assert data["topicsDiscussed"]
+    assert data["hcpName"] == "Dr. Patel" and data["date"]
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from backend.extraction_cache import ExtractionCache, normalize_interaction_text
+
+
+def make_cache(**kwargs) -> ExtractionCache:
+    return ExtractionCache(model_name="fake:model", prompt_version="v1", schema_version="s1", **kwargs)
+
+
+def counting_compute(result, calls, delay=0.0, error=None):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return dict(result)
+    return compute
+
+
+def test_keys_ignore_whitespace_and_unicode_form_but_not_variant_or_model():
+    cache = make_cache()
+    assert normalize_interaction_text("  Met Dr.  Patel\n") == "Met Dr. Patel"
+    assert cache.key_for("Met Dr. Patel") == cache.key_for(" Met  Dr.\tPatel ")
+    assert cache.key_for("Met Dr. Patel") != cache.key_for("Met Dr. Patel", variant="trimmed:date")
+    other = ExtractionCache(model_name="fake:other", prompt_version="v1", schema_version="s1")
+    assert cache.key_for("Met Dr. Patel") != other.key_for("Met Dr. Patel")
+
+
+def test_concurrent_identical_requests_share_one_computation():
+    cache, calls = make_cache(), []
+
+    async def run():
+        compute = counting_compute({"hcpName": "Dr. Patel"}, calls, delay=0.05)
+        return await asyncio.gather(*(cache.get_or_compute("Met Dr. Patel", compute) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {"hcpName": "Dr. Patel"} for result in results)
+    assert cache.stats["misses"] == 1 and cache.stats["coalesced"] == 9
+    # Every caller gets its own copy
+    results[0]["hcpName"] = "changed"
+    assert results[1]["hcpName"] == "Dr. Patel"
+
+
+def test_results_are_served_from_memory_afterwards():
+    cache, calls = make_cache(), []
+    compute = counting_compute({"date": "2024-05-03"}, calls)
+    asyncio.run(cache.get_or_compute("note", compute))
+    assert asyncio.run(cache.get_or_compute("note ", compute)) == {"date": "2024-05-03"}
+    assert len(calls) == 1 and cache.stats["memory_hits"] == 1
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache, calls = make_cache(), []
+
+    async def run():
+        failing = counting_compute({}, calls, delay=0.05, error=RuntimeError("LLM down"))
+        return await asyncio.gather(*(cache.get_or_compute("note", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert asyncio.run(cache.get_or_compute("note", counting_compute({"time": "09:00"}, calls))) == {"time": "09:00"}
+    assert len(calls) == 2
+
+
+def test_waiters_recompute_when_the_leader_is_cancelled():
+    cache, calls = make_cache(), []
+
+    async def run():
+        slow = counting_compute({"hcpName": "Dr. Lee"}, calls, delay=0.2)
+        leader = asyncio.create_task(cache.get_or_compute("note", slow))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(cache.get_or_compute("note", counting_compute({"hcpName": "Dr. Lee"}, calls)))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == {"hcpName": "Dr. Lee"}
+    assert len(calls) == 2
+
+
+def test_persistent_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    calls = []
+    asyncio.run(make_cache(sqlite_path=path).get_or_compute("note", counting_compute({"hcpSentiment": "Positive"}, calls)))
+    fresh = make_cache(sqlite_path=path)
+    assert asyncio.run(fresh.get_or_compute("note", counting_compute({}, calls))) == {"hcpSentiment": "Positive"}
+    assert len(calls) == 1 and fresh.stats["persistent_hits"] == 1
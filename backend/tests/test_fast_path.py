@@ -0,0 +1,108 @@
+from datetime import date
+
+import pytest
+
+from backend.catalog import CatalogIndex, HcpRecord, ProductRecord
+from backend.fast_path import (
+    _sentences,
+    extract_date,
+    extract_follow_up,
+    extract_hcp_name,
+    extract_sentiment,
+    extract_time,
+    extract_topics,
+)
+
+# A Wednesday
+TODAY = date(2024, 6, 12)
+
+
+@pytest.fixture
+def catalog():
+    return CatalogIndex(
+        [HcpRecord("Dr. Anita Patel", None, None), HcpRecord("Dr. Emily Chen", None, None)],
+        [ProductRecord("CardioPlus", None, None), ProductRecord("NeuroCalm", None, None)],
+        {},
+    )
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Met on 2024-05-02", "2024-05-02"),
+    ("Met on 5/2/2024", "2024-05-02"),
+    ("Met on May 12", "2024-05-12"),
+    ("Met on Sept. 3rd, 2023", "2023-09-03"),
+    ("Met on 3 March", "2024-03-03"),
+    ("Met on the 14th of July", "2023-07-14"),
+    ("Met yesterday", "2024-06-11"),
+    ("Visited two days ago", "2024-06-10"),
+    ("Met Monday", "2024-06-10"),
+    ("Met last Wednesday", "2024-06-05"),
+    ("Met this Wednesday", "2024-06-12"),
+    ("Met yesterday, i.e. May 12", None),
+    ("Met on February 30", None),
+    ("No date here", None),
+])
+def test_extract_date(text, expected):
+    assert extract_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text", ["Dismay 12 reps attended", "The grammar 5 handout", "Primary 3 outcome"])
+def test_month_names_must_start_a_word(text):
+    assert extract_date(text, TODAY) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Call at 3pm", "15:00"),
+    ("Call at 3:30 PM", "15:30"),
+    ("Call at 9 a.m.", "09:00"),
+    ("Meeting at 12am", "00:00"),
+    ("Meeting at 15:45", "15:45"),
+    ("Lunch at noon", "12:00"),
+    ("Call at 3pm, then 5pm", None),
+    ("Call at 13pm", None),
+])
+def test_extract_time(text, expected):
+    assert extract_time(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Met Dr. Patel today", "Dr. Anita Patel"),
+    ("Met Dr. Patel Monday", "Dr. Anita Patel"),
+    ("Met Dr. Patel May 12", "Dr. Anita Patel"),
+    ("Met with Dr. Johnson NeuroCalm samples were left", "Dr. Johnson"),
+    ("Call with Doctor Emily Chen", "Dr. Emily Chen"),
+    ("Met Dr. Raj Kumar", "Dr. Raj Kumar"),
+    ("Met Dr. Patel and Dr. Chen", None),
+    ("Met the cardiologist", None),
+])
+def test_extract_hcp_name(catalog, text, expected):
+    assert extract_hcp_name(text, catalog) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("She was very enthusiastic about the data", "Positive"),
+    ("He was skeptical of the trial design", "Negative"),
+    ("Not interested in switching", "Negative"),
+    ("Remained noncommittal", "Neutral"),
+    ("Interested but concerned about cost", None),
+    ("Dropped off samples", None),
+])
+def test_extract_sentiment(text, expected):
+    assert extract_sentiment(text) == expected
+
+
+def test_sentences_do_not_split_after_abbreviations():
+    text = "Met Dr. Patel today. Discussed dosing, e.g. titration with Mr. A. Smith. Need to send samples! Done; thanks"
+    assert _sentences(text) == [
+        "Met Dr. Patel today.",
+        "Discussed dosing, e.g. titration with Mr. A. Smith.",
+        "Need to send samples!",
+        "Done;",
+        "thanks",
+    ]
+
+
+def test_topics_and_follow_up_keep_honorifics():
+    text = "Met Dr. Patel today. Discussed the Dr. Chen study results. Need to send Dr. Patel the dosing guide."
+    assert extract_topics(text) == "The Dr. Chen study results"
+    assert extract_follow_up(text) == "Need to send Dr. Patel the dosing guide."
@@ -0,0 +1,115 @@
+import asyncio
+import base64
+import json
+from datetime import date
+
+import pytest
+
+from backend.database import AsyncSessionLocal, Interaction, create_db_and_tables
+from backend.ingest import bulk_insert_interactions
+from backend.listing import InteractionFilters, decode_cursor, encode_cursor, list_interactions
+
+HCP = "Dr. Listing Test"
+
+
+@pytest.fixture(scope="module")
+def interactions():
+    """Five dated rows (two on the same day) and three undated ones; returns their IDs in listing order."""
+    create_db_and_tables()
+    extracted = [
+        {"hcpName": HCP, "date": "2024-05-01", "hcpSentiment": "Positive", "interactionType": "Meeting"},
+        {"hcpName": HCP, "date": "2024-05-03", "hcpSentiment": "Negative", "interactionType": "Call"},
+        {"hcpName": HCP, "date": "2024-05-03", "hcpSentiment": "Positive", "interactionType": "Virtual Meeting"},
+        {"hcpName": HCP, "date": None, "hcpSentiment": "Positive", "interactionType": "Email"},
+        {"hcpName": HCP, "date": "2024-04-20", "hcpSentiment": "Neutral", "interactionType": "Meeting"},
+        {"hcpName": HCP, "date": "sometime last spring", "hcpSentiment": "Positive", "interactionType": "Call"},
+        {"hcpName": HCP, "date": "2024-05-02", "hcpSentiment": "Negative", "interactionType": "Meeting"},
+        {"hcpName": HCP, "date": None, "hcpSentiment": "Neutral", "interactionType": "Meeting"},
+    ]
+    ids = bulk_insert_interactions([Interaction.column_values(data) for data in extracted])
+    by_id = dict(zip(ids, extracted))
+    dated = sorted((i for i in ids if by_id[i]["date"] and by_id[i]["date"][0].isdigit()), key=lambda i: (by_id[i]["date"], i), reverse=True)
+    undated = sorted((i for i in ids if i not in dated), reverse=True)
+    return dated + undated
+
+
+def fetch_page(filters: InteractionFilters, cursor, limit: int):
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await list_interactions(db, filters, cursor, limit)
+    return asyncio.run(run())
+
+
+def fetch_all(filters: InteractionFilters, limit: int):
+    async def run():
+        pages, cursor = [], None
+        async with AsyncSessionLocal() as db:
+            while True:
+                page = await list_interactions(db, filters, decode_cursor(cursor) if cursor else None, limit)
+                pages.append([item["id"] for item in page["items"]])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    return pages
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 8, 50])
+def test_pages_cross_from_dated_to_undated_rows(interactions, limit):
+    pages = fetch_all(InteractionFilters(hcp_name=HCP), limit)
+    assert [i for page in pages for i in page] == interactions
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_cursor_inside_the_undated_tail(interactions):
+    page = fetch_page(InteractionFilters(hcp_name=HCP), (None, interactions[5]), 50)
+    assert [item["id"] for item in page["items"]] == interactions[6:]
+    assert page["next_cursor"] is None
+
+
+def test_tampered_cursors_only_move_the_position(interactions):
+    # A hand-edited but well-formed cursor is just another position in the (day, id) order
+    page = fetch_page(InteractionFilters(hcp_name=HCP), (date(2999, 1, 1), 0), 50)
+    assert [item["id"] for item in page["items"]] == interactions
+    page = fetch_page(InteractionFilters(hcp_name=HCP), (date(2024, 5, 3), 10**12), 50)
+    assert [item["id"] for item in page["items"]] == interactions
+    page = fetch_page(InteractionFilters(hcp_name=HCP), (None, -1), 50)
+    assert page["items"] == [] and page["next_cursor"] is None
+
+
+def test_date_range_excludes_undated_rows(interactions):
+    pages = fetch_all(InteractionFilters(hcp_name=HCP, date_from=date(2024, 5, 2)), 2)
+    assert [i for page in pages for i in page] == interactions[:3]
+
+
+def test_label_filters_ignore_case(interactions):
+    positive = fetch_all(InteractionFilters(hcp_name=HCP, sentiment="Positive"), 50)[0]
+    assert positive and fetch_all(InteractionFilters(hcp_name=HCP, sentiment="positive"), 50)[0] == positive
+    virtual = fetch_all(InteractionFilters(hcp_name=HCP, interaction_type="Virtual Meeting"), 50)[0]
+    assert len(virtual) == 1 and fetch_all(InteractionFilters(hcp_name=HCP, interaction_type="virtual  meeting"), 50)[0] == virtual
+
+
+def _token(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((date(2024, 5, 3), 42))) == (date(2024, 5, 3), 42)
+    assert decode_cursor(encode_cursor((None, 7))) == (None, 7)
+
+
+@pytest.mark.parametrize("token", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    _token("2024-05-03"),
+    _token(5),
+    _token([None]),
+    _token(["2024-05-03", 1, 2]),
+    _token(["2024-13-40", 1]),
+    _token(["2024-05-03", "abc"]),
+    _token(["2024-05-03", None]),
+    _token([["2024-05-03"], 1]),
+    _token({"day": "2024-05-03", "id": 1}),
+])
+def test_malformed_cursors_raise_value_error(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
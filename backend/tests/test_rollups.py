@@ -0,0 +1,64 @@
+from datetime import date
+
+from sqlalchemy import select
+
+from backend.database import Interaction, ProductMentionRollup, SentimentRollup, SessionLocal, create_db_and_tables
+from backend.ingest import bulk_insert_interactions
+from backend.projections import record_updated
+from backend.rollups import check_rollups
+
+# Weeks no other test writes to
+WEEK = date(2031, 3, 3)
+NEXT_WEEK = date(2031, 3, 10)
+
+
+def sentiment_counts(db):
+    rows = db.execute(select(SentimentRollup.week_start, SentimentRollup.hcp_name, SentimentRollup.sentiment, SentimentRollup.interaction_count)
+                      .where(SentimentRollup.week_start.in_([WEEK, NEXT_WEEK])))
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+
+def mention_counts(db):
+    rows = db.execute(select(ProductMentionRollup.week_start, ProductMentionRollup.territory, ProductMentionRollup.product,
+                             ProductMentionRollup.sentiment, ProductMentionRollup.mention_count)
+                      .where(ProductMentionRollup.week_start.in_([WEEK, NEXT_WEEK])))
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+
+def edit(interaction_id, **columns):
+    with SessionLocal() as db:
+        row = db.get(Interaction, interaction_id)
+        previous = {column: getattr(row, column) for column in Interaction.column_values({})}
+        for column, value in columns.items():
+            setattr(row, column, value)
+        db.flush()
+        record_updated(db, [row], {row.id: previous})
+        db.commit()
+
+
+def test_rollups_follow_inserts_edits_and_reassignments():
+    create_db_and_tables()
+    first, second = bulk_insert_interactions([
+        Interaction.column_values({"hcpName": "Dr. Smith", "date": "2031-03-04", "hcpSentiment": "Positive", "productsDiscussed": ["CardioPlus"]}),
+        Interaction.column_values({"hcpName": "Dr. Smith", "date": "2031-03-06", "hcpSentiment": "Positive", "productsDiscussed": ["CardioPlus", "NeuroCalm"]}),
+    ])
+    with SessionLocal() as db:
+        assert sentiment_counts(db) == {(WEEK, "Dr. Smith", "Positive"): 2}
+        assert mention_counts(db) == {(WEEK, "Midwest", "CardioPlus", "Positive"): 2, (WEEK, "Midwest", "NeuroCalm", "Positive"): 1}
+
+    # Sentiment edit: the count moves between keys and the emptied row is dropped
+    edit(first, hcp_sentiment="Negative")
+    with SessionLocal() as db:
+        assert sentiment_counts(db) == {(WEEK, "Dr. Smith", "Positive"): 1, (WEEK, "Dr. Smith", "Negative"): 1}
+        assert mention_counts(db) == {
+            (WEEK, "Midwest", "CardioPlus", "Positive"): 1,
+            (WEEK, "Midwest", "CardioPlus", "Negative"): 1,
+            (WEEK, "Midwest", "NeuroCalm", "Positive"): 1,
+        }
+
+    # Reassignment to another HCP (and territory), week and product list
+    edit(second, hcp_name="Dr. Patel", interaction_date="2031-03-11", interaction_day=date(2031, 3, 11), products_discussed=["NeuroCalm"])
+    with SessionLocal() as db:
+        assert sentiment_counts(db) == {(WEEK, "Dr. Smith", "Negative"): 1, (NEXT_WEEK, "Dr. Patel", "Positive"): 1}
+        assert mention_counts(db) == {(WEEK, "Midwest", "CardioPlus", "Negative"): 1, (NEXT_WEEK, "Northeast", "NeuroCalm", "Positive"): 1}
+        assert check_rollups(db)["consistent"]
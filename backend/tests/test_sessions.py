@@ -0,0 +1,67 @@
+import pytest
+
+from backend.catalog import CatalogIndex, HcpRecord, ProductRecord
+from backend.sessions import explicit_patch, normalize_edit, parse_edit
+
+
+@pytest.fixture
+def catalog():
+    return CatalogIndex(
+        [HcpRecord("Dr. Anita Patel", None, None)],
+        [
+            ProductRecord("CardioPlus", None, None, ["Efficacy data"]),
+            ProductRecord("NeuroCalm", None, None, ["Clinical outcomes"]),
+            ProductRecord("OncoBoost", None, None, ["Dosing information"]),
+        ],
+        {"CardioPlus": ["cardio plus"]},
+    )
+
+
+def test_explicit_patch_keeps_editable_fields_only():
+    patch = {"hcpSentiment": "Positive", "productsDiscussed": ["CardioPlus"], "topicsDiscussed": None, "id": 7}
+    assert explicit_patch(patch) == {"hcpSentiment": "Positive", "productsDiscussed": ["CardioPlus"], "topicsDiscussed": None}
+    assert explicit_patch(None) == {}
+
+
+@pytest.mark.parametrize("patch", [
+    ["hcpSentiment", "Positive"],
+    {"productsDiscussed": "CardioPlus"},
+    {"productsDiscussed": ["CardioPlus", 3]},
+    {"materialsShared": ["Brochure"]},
+    {"materialsShared": [{"id": "CardioPlus", "name": 1}]},
+    {"hcpSentiment": ["Positive"]},
+    {"date": 20240503},
+])
+def test_explicit_patch_rejects_wrong_value_types(patch):
+    with pytest.raises(ValueError):
+        explicit_patch(patch)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("remove CardioPlus, add NeuroCalm", ["OncoBoost", "NeuroCalm"]),
+    ("remove CardioPlus and NeuroCalm", ["OncoBoost"]),
+    ("CardioPlus and OncoBoost were not discussed", []),
+    ("we didn't discuss CardioPlus but also covered NeuroCalm", ["OncoBoost", "NeuroCalm"]),
+    ("also add NeuroCalm", ["CardioPlus", "OncoBoost", "NeuroCalm"]),
+    ("it was NeuroCalm", ["NeuroCalm"]),
+])
+def test_parse_edit_products(catalog, text, expected):
+    draft = {"productsDiscussed": ["cardio plus", "OncoBoost"]}
+    assert parse_edit(text, draft, catalog)["productsDiscussed"] == expected
+
+
+def test_normalize_edit_canonicalizes_patched_names(catalog):
+    changes = normalize_edit({"hcpName": "patel, anita", "productsDiscussed": ["cardio plus", "CardioPlus"]}, {}, catalog)
+    assert changes["hcpName"] == "Dr. Anita Patel"
+    assert changes["productsDiscussed"] == ["CardioPlus"]
+
+
+def test_normalize_edit_rederives_default_materials_only(catalog):
+    draft = {"productsDiscussed": ["CardioPlus"], "materialsShared": [{"id": "CardioPlus", "name": "Efficacy data"}]}
+    changes = normalize_edit({"productsDiscussed": ["NeuroCalm"]}, draft, catalog)
+    assert changes["materialsShared"] == [{"id": "NeuroCalm", "name": "Clinical outcomes"}]
+
+    chosen = {**draft, "materialsShared": [{"id": "Brochure", "name": "Patient brochure"}]}
+    assert "materialsShared" not in normalize_edit({"productsDiscussed": ["NeuroCalm"]}, chosen, catalog)
+    patched = normalize_edit({"productsDiscussed": ["NeuroCalm"], "materialsShared": []}, draft, catalog)
+    assert patched["materialsShared"] == []
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from backend.database import Interaction, SessionLocal, create_db_and_tables
+from backend.history import check_history_consistency
+from backend.ingest import bulk_insert_interactions
+from backend.write_behind import WriteBehindWriter
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+def stored_ids(ids):
+    with SessionLocal() as db:
+        return set(db.scalars(select(Interaction.id).where(Interaction.id.in_(ids))))
+
+
+def row(hcp_name: str = "Dr. Write Behind"):
+    return Interaction.column_values({"hcpName": hcp_name, "date": "2024-05-01", "hcpSentiment": "Positive"})
+
+
+def test_rows_are_group_committed_and_acknowledged():
+    async def run():
+        writer = WriteBehindWriter(batch_size=4, flush_interval_ms=100)
+        await writer.start()
+        submitted = [await writer.submit(row()) for _ in range(10)]
+        acknowledged = await asyncio.gather(*(accepted for _, accepted in submitted))
+        await writer.stop()
+        return writer, [interaction_id for interaction_id, _ in submitted], acknowledged
+
+    writer, ids, acknowledged = asyncio.run(run())
+    assert acknowledged == ids and ids == list(range(ids[0], ids[0] + 10))
+    assert stored_ids(ids) == set(ids)
+    assert writer.stats["committed"] == 10 and writer.stats["batches"] == 3
+    with SessionLocal() as db:
+        assert check_history_consistency(db)["consistent"]
+
+
+def test_a_conflicting_row_fails_alone():
+    async def run():
+        writer = WriteBehindWriter(batch_size=10, flush_interval_ms=100)
+        await writer.start()
+        # Another writer takes the next ID behind the writer's back
+        await asyncio.to_thread(bulk_insert_interactions, [row("Dr. Other Writer")], [writer._next_id])
+        submitted = [await writer.submit(row()) for _ in range(3)]
+        results = await asyncio.gather(*(accepted for _, accepted in submitted), return_exceptions=True)
+        await writer.stop()
+        return writer, [interaction_id for interaction_id, _ in submitted], results
+
+    writer, ids, results = asyncio.run(run())
+    assert isinstance(results[0], Exception)
+    assert results[1:] == ids[1:]
+    assert stored_ids(ids[1:]) == set(ids[1:])
+    assert writer.stats["failed"] == 1 and writer.stats["committed"] == 2
+
+
+def test_stop_flushes_queued_rows_and_wait_committed_waits():
+    async def run():
+        writer = WriteBehindWriter(batch_size=100, flush_interval_ms=60_000)
+        await writer.start()
+        first_id, _ = await writer.submit(row())
+        waiting = asyncio.create_task(writer.wait_committed(first_id))
+        second_id, accepted = await writer.submit(row())
+        await asyncio.sleep(0.05)
+        assert not waiting.done() and stored_ids([first_id]) == set()
+        await writer.stop()
+        await waiting
+        return [first_id, second_id], await accepted
+
+    ids, acknowledged = asyncio.run(run())
+    assert acknowledged == ids[1]
+    assert stored_ids(ids) == set(ids)
+
+
+def test_submit_requires_start():
+    with pytest.raises(RuntimeError):
+        asyncio.run(WriteBehindWriter().submit(row()))
@@ -0,0 +1,158 @@
+# backend/write_behind.py
+# Optional write-behind persistence for interactions (INTERACTION_WRITE_MODE=write_behind).
+# Extracted interactions are queued in-process and a background task group-commits them every
+# WRITE_BEHIND_BATCH_SIZE rows or WRITE_BEHIND_FLUSH_MS milliseconds, whichever comes first,
+# so insert throughput scales with batch size instead of one fsync per interaction.
+#
+# IDs are handed out from an in-process counter seeded from MAX(id), so callers get their ID immediately.
+# This assumes this process is the only writer while write-behind is enabled (don't run the ingest CLI
+# against the same database at the same time); a conflicting ID surfaces as a failed acknowledgement.
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from .database import Interaction, SessionLocal
+from .projections import record_inserted
+from .telemetry import log_event
+
+
+class WriteBehindWriter:
+    """Queue + background group-commit task. `submit` returns the assigned ID and an acknowledgement future
+    that resolves once the row is durably committed (or fails with the write error)."""
+
+    def __init__(self, batch_size: int = 100, flush_interval_ms: float = 50, max_queue: int = 10_000):
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_ms / 1000
+        self.queue: "asyncio.Queue[Optional[Tuple[Dict[str, Any], asyncio.Future]]]" = asyncio.Queue(max_queue)
+        self._next_id = 1
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {} # Acknowledgements of queued rows, by ID
+        self.stats = {"accepted": 0, "committed": 0, "failed": 0, "batches": 0}
+
+    async def start(self) -> None:
+        self._next_id = await asyncio.to_thread(self._max_id) + 1
+        self._task = asyncio.create_task(self._run())
+
+    @staticmethod
+    def _max_id() -> int:
+        with SessionLocal() as db:
+            return db.scalar(select(func.max(Interaction.id))) or 0
+
+    def allocate_ids(self, count: int) -> List[int]:
+        """Reserve `count` consecutive IDs without touching the database."""
+        first = self._next_id
+        self._next_id += count
+        return list(range(first, first + count))
+
+    async def submit(self, column_values: Dict[str, Any]) -> Tuple[int, asyncio.Future]:
+        """Queue one interaction for the next group commit. Blocks only when the queue is full (backpressure)."""
+        if self._task is None:
+            raise RuntimeError("WriteBehindWriter.start() has not been called")
+        interaction_id = self.allocate_ids(1)[0]
+        accepted = asyncio.get_running_loop().create_future()
+        self._pending[interaction_id] = accepted
+        accepted.add_done_callback(lambda _: self._pending.pop(interaction_id, None))
+        await self.queue.put(({**column_values, "id": interaction_id}, accepted))
+        self.stats["accepted"] += 1
+        return interaction_id, accepted
+
+    async def wait_committed(self, interaction_id: int) -> None:
+        """Wait until a queued row is committed (returns at once for rows that are not queued)."""
+        accepted = self._pending.get(interaction_id)
+        if accepted is not None:
+            await asyncio.shield(accepted)
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval_seconds
+            # Gather more rows until the batch is full or the flush interval elapses
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        rows = [row for row, _ in batch]
+        try:
+            await asyncio.to_thread(self._write_rows, rows)
+            results: List[Optional[Exception]] = [None] * len(batch)
+        except Exception as e:
+            # One bad row must not fail the whole batch: retry rows individually to isolate it
+            log_event("Write-behind batch failed; retrying rows individually", level="warning", rows=len(rows), error=str(e))
+            results = []
+            for row in rows:
+                try:
+                    await asyncio.to_thread(self._write_rows, [row])
+                    results.append(None)
+                except Exception as row_error:
+                    results.append(row_error)
+
+        self.stats["batches"] += 1
+        for (row, accepted), error in zip(batch, results):
+            if error is None:
+                self.stats["committed"] += 1
+                if not accepted.done():
+                    accepted.set_result(row["id"])
+            else:
+                self.stats["failed"] += 1
+                log_event("Write-behind failed to persist interaction", level="error", interaction_id=row["id"], error=str(error))
+                if not accepted.done():
+                    accepted.set_exception(error)
+                    # Nobody may be waiting for this acknowledgement; don't warn about an unretrieved exception
+                    accepted.exception()
+
+    @staticmethod
+    def _write_rows(rows: List[Dict[str, Any]]) -> None:
+        with SessionLocal() as db:
+            interactions = [Interaction(**row) for row in rows]
+            db.add_all(interactions)
+            db.flush()
+            record_inserted(db, interactions)
+            db.commit() # One commit (and one fsync) for the whole batch
+
+    async def stop(self) -> None:
+        """Flush everything queued so far and stop the background task."""
+        if self._task is None:
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+        # Rows queued after the stop sentinel (if any) are written in a final batch
+        leftovers = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            await self._commit(leftovers)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "queue_depth": self.queue.qsize()}
+
+
+def write_behind_from_env() -> Optional[WriteBehindWriter]:
+    """Return a writer when INTERACTION_WRITE_MODE=write_behind, else None (synchronous per-request commits)."""
+    if os.getenv("INTERACTION_WRITE_MODE", "sync") != "write_behind":
+        return None
+    return WriteBehindWriter(
+        batch_size=int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100")),
+        flush_interval_ms=float(os.getenv("WRITE_BEHIND_FLUSH_MS", "50")),
+        max_queue=int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000")),
+    )